@@ -59,12 +59,12 @@
 # ```
 # > The resulting list is sorted alphabetically. For example:
 # ```python
-# > import struct
-# > dir() # show the names in the module namespace
+# import struct
+# dir() # show the names in the module namespace
 # ['__builtins__', '__name__', 'struct']
 # dir(struct) # show the names in the struct module
-# ['Struct', '__all__', '__builtins__', '__cached__', '__doc__', '__file__', '__initializing__', 
-# '__loader__', '__name__', '__package__', '_clearcache', 'calcsize', 'error', 'pack', 'pack_into', 'unpack', 'unpack_from']
+# ['Struct', '__all__', '__builtins__', '__cached__', '__doc__', '__file__', '__loader__', '__name__',
+# '__package__', '__spec__', '_clearcache', 'calcsize', 'error', 'iter_unpack', 'pack', 'pack_into', 'unpack', 'unpack_from']
 # class Shape:
 #     def __dir__(self):
 #         return ['area', 'perimeter', 'location']
@@ -257,13 +257,13 @@
 # > Transform a method into a static method. A static method does not receive an implicit first argument. To declare a static method, use this idiom:
 # ```python
 # class C:
-# @staticmethod
-# def f(arg1, arg2, ...): ...
+#     @staticmethod
+#     def f(arg1, arg2, ...): ...
 # ```
 # > The @staticmethod form is a function decorator – see function for details. A static method can be called either on the class (such as C.f()) or on an instance (such as C().f()). Static methods in Python are similar to those found in Java or C++. Also see classmethod() for a variant that is useful for creating alternate class constructors. Like all decorators, it is also possible to call staticmethod as a regular function and do something with its result. This is needed in some cases where you need a reference to a function from a class body and you want to avoid the automatic transformation to instance method. For these cases, use this idiom:
 # ```python
 # class C:
-# builtin_open = staticmethod(open)
+#     builtin_open = staticmethod(open)
 # ```
 # > For more information on static methods, see types.
 # 
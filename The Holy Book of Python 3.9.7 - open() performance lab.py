@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## open() performance lab
+
+# The **open (file, mode = ’r’, buffering = -1, encoding = None, errors = None, newline = None, closefd = True, opener = None)** entry of chapter 1 lists the modes but stops short of the other parameters. This chapter fills in **buffering** and measures what the choices cost, with the companion module `holybook.iolab`.
+# 
+# **buffering**
+# > An optional integer used to set the buffering policy. Pass 0 to switch buffering off (only allowed in binary mode), 1 to select line buffering (only usable in text mode), and an integer > 1 to indicate the size in bytes of a fixed-size chunk buffer. When no buffering argument is given, binary files are buffered in fixed-size chunks whose size is chosen from the device's block size, falling back on io.DEFAULT_BUFFER_SIZE (typically 4096 or 8192 bytes); interactive text files use line buffering.
+# 
+# **Text vs binary**
+# > Files opened in binary mode ('b') return bytes without any decoding. In text mode the bytes are decoded with encoding and newlines are translated, which costs time on every read.
+
+# ### Measuring
+# 
+# Run the notebook from the repository root so that `holybook` can be imported. Every case reads or writes a scratch file of each size from 4 KiB up to `MAX_SIZE`. The default of 16 MiB runs in seconds; raise it to `'2G'` to include files larger than the page cache, which needs that much free disk space. Reads happen right after the file is written, so they measure a warm page cache.
+
+# In[ ]:
+
+
+from holybook import iolab
+
+MAX_SIZE = iolab.parse_size('16M')
+sizes = [size for size in iolab.SIZES if size <= MAX_SIZE]
+results = iolab.run_lab(sizes)
+
+
+# In[ ]:
+
+
+from IPython.display import Markdown
+
+Markdown(iolab.render_markdown(results))
+
+
+# ### Reading fast
+# 
+# What the tables showed when this chapter was written:
+# 
+# * Going line by line is the largest single cost: iterating a file object, text or binary, is about ten times slower than reading large blocks. Decoding text adds to that.
+# * Line buffering (buffering = 1) turns every written line into a system call, and buffering = 0 does the same for binary writes. Write in large blocks instead.
+# * For large files, reading into one reused buffer with readinto() is as fast as any other way, and it allocates nothing per read.
+# 
+# **iolab.iter_chunks (path, chunk_size = 1 MiB)**
+# > Yield the file as memoryview slices of one reused bytearray. Each view is valid until the next one is requested.
+# 
+# **iolab.iter_line_blocks (path, chunk_size = 1 MiB)**
+# > Like iter_chunks(), but every view ends on a newline, so a block never splits a line. Only the partial line at the end of each read is moved.
+# 
+# **iolab.iter_lines (path, chunk_size = 1 MiB, keepends = False)**
+# > Yield the lines as bytes, splitting a block at a time. Prefer the blocks when the work can be done on many lines at once:
+
+# In[ ]:
+
+
+import os, tempfile
+
+with tempfile.TemporaryDirectory() as scratch:
+    path = os.path.join(scratch, 'access.log')
+    iolab.make_file(path, 16 * iolab.MiB)
+    lines = sum(block.tobytes().count(b'\n') for block in iolab.iter_line_blocks(path))
+lines
+
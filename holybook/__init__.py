@@ -0,0 +1,24 @@
+"""Companion tools for The Holy Book of Python.
+
+The parser is imported on first use so that ``python -m holybook`` lookups,
+which only read the compiled index, stay cheap to start.
+"""
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BOOK_PY = ROOT / "The Holy Book of Python 3.9.7 - 1.py"
+BOOK_IPYNB = ROOT / "The Holy Book of Python 3.9.7 - 1.ipynb"
+CACHE_DIR = ROOT / ".holybook"
+
+__all__ = ["BOOK_IPYNB", "BOOK_PY", "CACHE_DIR", "Cell", "Entry", "ROOT", "find_entry", "load_entries"]
+
+_LAZY = {"Cell", "Entry", "find_entry", "load_entries"}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        from holybook import book
+
+        return getattr(book, name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -0,0 +1,47 @@
+"""Look an entry up in the book: ``python -m holybook sorted``."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+from holybook.index import DEFAULT_INDEX, build, open_index
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="holybook", description="Print the book's entry for a built-in.")
+    parser.add_argument("name", nargs="?", help="entry to show, e.g. sorted, @classmethod, exit")
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX, help="compiled index (default: %(default)s)")
+    parser.add_argument("--source", type=Path, help="book to compile, the .py export or the .ipynb")
+    parser.add_argument("--build", action="store_true", help="recompile the index and exit")
+    parser.add_argument("--list", action="store_true", help="list the indexed names")
+    parser.add_argument("--complete", metavar="PREFIX", help="list the names starting with PREFIX")
+    args = parser.parse_args(argv)
+
+    if args.build:
+        count = build(args.source, args.index)
+        print("indexed %d entries into %s" % (count, args.index))
+        return 0
+
+    with open_index(args.index, args.source) as index:
+        if args.list or args.complete is not None:
+            names = index.complete(args.complete) if args.complete is not None else list(index.names())
+            print("\n".join(names))
+            return 0
+        if not args.name:
+            parser.error("a name is required")
+        entry = index.lookup(args.name)
+        if entry is None:
+            print("holybook: no entry for %r" % args.name, file=sys.stderr)
+            return 1
+        for signature in entry.signatures:
+            print(signature)
+        print()
+        print(entry.body)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Flag slow built-in usage that the book itself advises against.
+
+Each rule comes from an entry's own guidance:
+
+=====  ======  ==============================================================
+HB001  sum     ``sum(items, [])`` / ``sum(items, ())``: use itertools.chain()
+HB002  sum     ``text += item`` on a string in a loop: use ``''.join(items)``
+HB003  pow     ``pow(base, exp) % mod`` or ``base ** exp % mod``: use
+               ``pow(base, exp, mod)``
+HB004  filter  ``filter(lambda ...)``: use a generator expression
+HB005  sum     ``sum()`` of float literals, ``float()`` calls or from a float
+               start: use ``math.fsum()`` for an exactly rounded total
+=====  ======  ==============================================================
+
+HB005 is about accuracy, not speed: ``math.fsum`` is the slower of the two,
+and its measured cost is shown as such.
+
+Files are parsed in a process pool and findings are cached per file by
+mtime and size; entries for files no longer found under the scanned paths
+are dropped.  When benchmark results from :mod:`holybook.bench` are
+available, every finding is shown with the speedup measured for its rule.
+
+    python -m holybook.analyze src/
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from holybook import BOOK_PY, CACHE_DIR
+
+VERSION = 2
+DEFAULT_CACHE = CACHE_DIR / "analyze.json"
+DEFAULT_BENCH = CACHE_DIR / "bench.json"
+SKIP_DIRS = frozenset({".git", ".hg", ".svn", ".tox", ".nox", ".venv", "venv", "__pycache__", "node_modules", ".holybook"})
+
+
+class Rule(NamedTuple):
+    code: str
+    entry: str
+    advice: str
+    # Benchmark labels (slow, fast) whose ratio is the rule's speedup.
+    workloads: Tuple[str, str]
+
+
+RULES = {
+    rule.code: rule
+    for rule in (
+        Rule("HB001", "sum", "concatenate with itertools.chain() instead of sum(..., [])",
+             ("sum(lists, [])", "list(itertools.chain.from_iterable(lists))")),
+        Rule("HB002", "sum", "build strings with ''.join(...) instead of += in a loop",
+             ("text += item (loop)", "''.join(strings)")),
+        Rule("HB003", "pow", "use the three-argument pow(base, exp, mod)",
+             ("pow(base, exp) % mod", "pow(base, exp, mod)")),
+        Rule("HB004", "filter", "use a generator expression instead of filter(lambda ...)",
+             ("filter(lambda item: item, iterable)", "(item for item in iterable if item)")),
+        Rule("HB005", "sum", "add floats with math.fsum() for an exactly rounded total",
+             ("sum(floats)", "math.fsum(floats)")),
+    )
+}
+
+
+class Finding(NamedTuple):
+    path: str
+    line: int
+    col: int
+    code: str
+
+
+class Checker(ast.NodeVisitor):
+    def __init__(self) -> None:
+        self.found: List[Tuple[int, int, str]] = []
+        # Names bound to a string literal, one set per function scope.
+        self.strings: List[set] = [set()]
+        self.loops = 0
+
+    def report(self, node: ast.AST, code: str) -> None:
+        self.found.append((node.lineno, node.col_offset, code))
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if isinstance(node.func, ast.Name):
+            name = node.func.id
+            if name == "sum":
+                start = node.args[1] if len(node.args) > 1 else None
+                for keyword in node.keywords:
+                    if keyword.arg == "start":
+                        start = keyword.value
+                if isinstance(start, (ast.List, ast.Tuple)) or _is_call_to(start, "list", "tuple"):
+                    self.report(node, "HB001")
+                elif _is_float(start) or node.args and _holds_floats(node.args[0]):
+                    self.report(node, "HB005")
+            elif name == "filter" and node.args and isinstance(node.args[0], ast.Lambda):
+                self.report(node, "HB004")
+        self.generic_visit(node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> None:
+        if isinstance(node.op, ast.Mod):
+            left = node.left
+            if isinstance(left, ast.BinOp) and isinstance(left.op, ast.Pow) or (
+                _is_call_to(left, "pow") and len(left.args) == 2 and not left.keywords
+            ):
+                self.report(node, "HB003")
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        is_string = isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if is_string:
+                    self.strings[-1].add(target.id)
+                else:
+                    self.strings[-1].discard(target.id)
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node: ast.AugAssign) -> None:
+        if (
+            self.loops
+            and isinstance(node.op, ast.Add)
+            and isinstance(node.target, ast.Name)
+            and node.target.id in self.strings[-1]
+        ):
+            self.report(node, "HB002")
+        self.generic_visit(node)
+
+    def _loop(self, node: ast.AST) -> None:
+        self.loops += 1
+        self.generic_visit(node)
+        self.loops -= 1
+
+    visit_For = visit_AsyncFor = visit_While = _loop
+
+    def _scope(self, node: ast.AST) -> None:
+        self.strings.append(set())
+        loops, self.loops = self.loops, 0
+        self.generic_visit(node)
+        self.loops = loops
+        self.strings.pop()
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = visit_ClassDef = _scope
+
+
+def _is_call_to(node: Optional[ast.AST], *names: str) -> bool:
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in names
+
+
+def _is_float(node: Optional[ast.AST]) -> bool:
+    return isinstance(node, ast.Constant) and type(node.value) is float or _is_call_to(node, "float")
+
+
+def _holds_floats(node: ast.AST) -> bool:
+    """A display or comprehension whose items are float literals or ``float()`` calls."""
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return bool(node.elts) and all(_is_float(item) for item in node.elts)
+    if isinstance(node, (ast.ListComp, ast.GeneratorExp, ast.SetComp)):
+        return _is_float(node.elt)
+    return False
+
+
+def check_source(source: str, filename: str = "<source>") -> List[Tuple[int, int, str]]:
+    try:
+        tree = ast.parse(source, filename)
+    except (SyntaxError, ValueError):
+        return []
+    checker = Checker()
+    checker.visit(tree)
+    return sorted(checker.found)
+
+
+def check_file(path: str) -> List[Tuple[int, int, str]]:
+    try:
+        with open(path, "rb") as f:
+            source = f.read()
+    except OSError:
+        return []
+    return check_source(source, path)
+
+
+def iter_python_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    yield os.path.join(root, name)
+
+
+def analyze(
+    paths: Iterable[str],
+    cache_path: Optional[Path] = DEFAULT_CACHE,
+    jobs: Optional[int] = None,
+) -> List[Finding]:
+    """Check every Python file under ``paths``, reusing cached results for
+    files whose mtime and size are unchanged.
+
+    Cached files under ``paths`` that this scan did not find (deleted,
+    renamed, or now skipped) are dropped from the cache.
+    """
+    cache: Dict[str, list] = {}
+    if cache_path is not None:
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("version") == VERSION:
+                cache = stored["files"]
+        except (OSError, ValueError):
+            pass
+
+    paths = list(paths)
+    files = {}
+    pending = []
+    seen = set()
+    for path in iter_python_files(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        key = os.path.abspath(path)
+        seen.add(key)
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        cached = cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            files[path] = cached[1]
+        else:
+            pending.append((path, key, stamp))
+
+    if pending:
+        names = [path for path, _, _ in pending]
+        if len(names) < 8 or jobs == 1:
+            results = [check_file(name) for name in names]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(check_file, names, chunksize=max(1, len(names) // (8 * (os.cpu_count() or 1)))))
+        for (path, key, stamp), found in zip(pending, results):
+            files[path] = found
+            cache[key] = [stamp, found]
+
+    roots = [os.path.abspath(path) for path in paths]
+    gone = [
+        key for key in cache
+        if key not in seen and any(key == root or key.startswith(os.path.join(root, "")) for root in roots)
+    ]
+    for key in gone:
+        del cache[key]
+    if cache_path is not None and (pending or gone):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(cache_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "files": cache}, f)
+        os.replace(tmp, cache_path)
+
+    return [Finding(path, line, col, code) for path in sorted(files) for line, col, code in files[path]]
+
+
+def speedups(bench_path: Path) -> Dict[str, str]:
+    """Describe the measured speedup of each rule from a bench JSON file."""
+    from holybook.bench import read_json
+
+    try:
+        results = read_json(str(bench_path))
+    except (OSError, ValueError, KeyError):
+        return {}
+    best = {}
+    for r in results:
+        if r.kind == "list":
+            best[(r.label, r.size)] = r.best
+    described = {}
+    for rule in RULES.values():
+        slow, fast = rule.workloads
+        sizes = [size for (label, size) in best if label == slow and (fast, size) in best]
+        if sizes:
+            size = max(sizes)
+            ratio = best[(slow, size)] / best[(fast, size)]
+            if ratio >= 1:
+                described[rule.code] = "%.1fx faster at n=%d" % (ratio, size)
+            else:
+                described[rule.code] = "%.1fx slower at n=%d" % (1 / ratio, size)
+    return described
+
+
+def entry_links() -> Dict[str, str]:
+    from holybook.book import find_entry, load_entries
+
+    entries = load_entries()
+    links = {}
+    for rule in RULES.values():
+        entry = find_entry(entries, rule.entry)
+        if entry is not None:
+            links[rule.code] = "%s:%d" % (BOOK_PY.name, entry.lineno)
+    return links
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.analyze", description="Flag slow built-in usage.")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--bench", type=Path, default=DEFAULT_BENCH, help="holybook.bench JSON results (default: %(default)s)")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    findings = analyze(args.paths, None if args.no_cache else args.cache, args.jobs)
+    measured = speedups(args.bench) if findings else {}
+    links = entry_links() if findings else {}
+    for finding in findings:
+        rule = RULES[finding.code]
+        extra = [rule.entry + (" (%s)" % links[rule.code] if rule.code in links else "")]
+        if rule.code in measured:
+            extra.append(measured[rule.code])
+        print("%s:%d:%d: %s %s [%s]" % (finding.path, finding.line, finding.col + 1, rule.code, rule.advice, "; ".join(extra)))
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+"""Batched versions of the numeric and aggregate built-ins, on NumPy.
+
+Each function takes the same arguments as its built-in, but over a whole
+sequence at once.  When the input is a large homogeneous numeric sequence
+or buffer (a 1-D NumPy array, an ``array.array``, a ``memoryview``, or a
+long list or tuple holding only ints, only floats or only bools) the work is
+done by NumPy; otherwise, or when NumPy is not installed, the built-in runs.
+
+The semantics the book spells out are kept:
+
+* ``sum`` adds ``start``, and sums of ints never overflow: when an int64
+  total could, the Python ints are summed instead;
+* ``sorted`` is stable, including with ``reverse=True``; of the ``key``
+  functions only ``None`` and ``abs`` are vectorized;
+* ``round`` rounds half to even and returns ints without ``ndigits``;
+  rounding to ``ndigits`` places uses the built-in, as NumPy's scaled
+  rounding is not correctly rounded;
+* ``divmod`` gives the remainder the sign of the divisor and raises
+  ``ZeroDivisionError``;
+* ``min``/``max`` honour ``key`` and ``default`` (via the built-in), and
+  inputs holding NaN, whose ordering NumPy defines differently, fall back.
+
+Float sums may differ from the built-in in the last bit: NumPy adds
+pairwise, the built-in left to right (before 3.12) or compensated (3.12+).
+Float powers may too, as NumPy's vectorized ``power`` is not the C
+library's ``pow``.
+
+The element-wise functions (``abs``, ``round``, ``divmod``, ``pow``) return
+an array for an array input and a list otherwise, like
+``list(map(abs, values))``.  ``zip`` is the built-in itself, a lazy
+iterator of tuples; ``zip_rows`` builds the same tuples as the rows of one
+2-D array.
+
+    python -m holybook.batched    # find where each version starts to win
+"""
+
+from __future__ import annotations
+
+import argparse
+import array
+import builtins
+import numbers
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised without NumPy
+    np = None
+
+_INT64_MAX = (1 << 63) - 1
+
+# Below these lengths lists and tuples are left to the built-ins, since
+# converting them costs more than NumPy saves.  Re-derive them for a machine
+# with ``python -m holybook.batched``.
+LIST_THRESHOLDS: Dict[str, int] = {
+    "sum": 1 << 62,
+    "min": 1 << 62,
+    "max": 1 << 62,
+    "sorted": 1 << 62,
+    "abs": 1 << 62,
+    "round": 1000,
+    "divmod": 10000,
+    "pow": 100000,
+    "any": 1 << 62,
+    "all": 1 << 62,
+}
+# Arrays are always cheaper to hand to NumPy than to iterate, except tiny ones.
+ARRAY_THRESHOLD = 16
+
+
+def _array(values: Any, name: str) -> Optional["np.ndarray"]:
+    """``values`` as a 1-D numeric array, or ``None`` to use the built-in."""
+    if np is None:
+        return None
+    if isinstance(values, np.ndarray):
+        a = values
+    elif isinstance(values, (array.array, memoryview)):
+        try:
+            a = np.asarray(values)
+        except (TypeError, ValueError):
+            return None
+    elif isinstance(values, (bytes, bytearray)):
+        a = np.frombuffer(values, dtype=np.uint8)
+    elif isinstance(values, (list, tuple)):
+        if len(values) < LIST_THRESHOLDS.get(name, 0):
+            return None
+        kinds = set(map(type, values))
+        if len(kinds) != 1:
+            return None
+        kind = kinds.pop()
+        dtype = {int: np.int64, float: np.float64, bool: np.bool_}.get(kind)
+        if dtype is None:
+            return None
+        try:
+            return np.array(values, dtype=dtype)
+        except OverflowError:
+            return None
+    else:
+        return None
+    if a.ndim != 1 or a.dtype.kind not in "biuf" or a.size < ARRAY_THRESHOLD:
+        return None
+    return a
+
+
+def _has_nan(a: "np.ndarray") -> bool:
+    return a.dtype.kind == "f" and bool(np.isnan(a).any())
+
+
+def _int_bound(a: "np.ndarray") -> int:
+    """The largest magnitude in an int array, as a Python int."""
+    if a.dtype.kind == "b" or a.size == 0:
+        return 1
+    return builtins.max(builtins.abs(int(a.min())), builtins.abs(int(a.max())))
+
+
+def _widen(a: "np.ndarray") -> "np.ndarray":
+    """Bool and narrow int arrays as int64, where Python's results fit."""
+    if a.dtype.kind == "b" or a.dtype.kind in "iu" and a.dtype.itemsize < 8:
+        return a.astype(np.int64)
+    return a
+
+
+def _result(values: Any, out: "np.ndarray") -> Any:
+    return out if isinstance(values, np.ndarray) else out.tolist()
+
+
+def _items(values: Any) -> Any:
+    """Array elements as Python numbers, so the built-ins keep their rules."""
+    if np is not None and isinstance(values, (np.ndarray, np.generic)):
+        return values.tolist()
+    return values
+
+
+def _operand(value: Any, name: str) -> Any:
+    """The second operand of ``divmod``/``pow``: a real scalar or an array.
+
+    ``None`` means the built-in must run, as for a Python int too wide for
+    int64.
+    """
+    if np is not None and isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, numbers.Number):
+        if not isinstance(value, numbers.Real):
+            return None
+        if isinstance(value, int) and builtins.abs(value) > _INT64_MAX:
+            return None
+        return value
+    return _array(value, name)
+
+
+def _fallback(values: Any, items: list) -> Any:
+    """Shape a built-in's element-wise results like the NumPy path's."""
+    if np is not None and isinstance(values, np.ndarray):
+        out = np.array(items)
+        kinds = set(map(type, items))
+        if len(kinds) > 1 or out.dtype.kind == "f" and int in kinds:
+            # Mixed results (float and complex powers) and ints too wide
+            # for int64 are kept as they are, as object elements.
+            return np.array(items, dtype=object)
+        return out
+    return items
+
+
+def sum(iterable, start=0):
+    a = _array(iterable, "sum")
+    if a is None or type(start) not in (int, float):
+        return builtins.sum(_items(iterable), start)
+    if a.dtype.kind in "biu":
+        if _int_bound(a) * a.size > _INT64_MAX:
+            return builtins.sum(a.tolist(), start)
+        return start + int(a.sum(dtype=np.int64))
+    return start + float(a.sum(dtype=np.float64))
+
+
+def _extreme(builtin: Callable, reduce: str, args: tuple, key, default, has_default: bool):
+    if len(args) == 1 and key is None:
+        a = _array(args[0], builtin.__name__)
+        if a is not None and not _has_nan(a):
+            return getattr(a, reduce)().item()
+    kwargs = {"key": key}
+    if has_default:
+        kwargs["default"] = default
+    if len(args) == 1:
+        args = (_items(args[0]),)
+    return builtin(*args, **kwargs)
+
+
+_MISSING = object()
+
+
+def min(*args, key=None, default=_MISSING):
+    return _extreme(builtins.min, "min", args, key, default, default is not _MISSING)
+
+
+def max(*args, key=None, default=_MISSING):
+    return _extreme(builtins.max, "max", args, key, default, default is not _MISSING)
+
+
+def sorted(iterable, *, key=None, reverse=False):
+    a = _array(iterable, "sorted") if key in (None, builtins.abs) else None
+    if a is None or _has_nan(a) or a.dtype.kind == "i" and _int_bound(a) > _INT64_MAX - 1:
+        return builtins.sorted(_items(iterable), key=key, reverse=reverse)
+    # Widen first: negating or taking ``abs`` of a narrow signed minimum
+    # wraps around to itself.
+    keys = _widen(a)
+    if key is builtins.abs:
+        keys = np.abs(keys)
+    if reverse:
+        # Stable descending order: equal items keep their input order,
+        # which reversing an ascending sort would not.
+        if keys.dtype.kind == "u":
+            keys = np.iinfo(keys.dtype).max - keys
+        else:
+            keys = -keys
+    order = np.argsort(keys, kind="stable")
+    return a[order].tolist()
+
+
+def abs(values):
+    a = _array(values, "abs")
+    if a is not None:
+        a = _widen(a)
+    if a is None or a.dtype.kind == "i" and int(a.min()) == -(1 << 63):
+        return _fallback(values, list(map(builtins.abs, _items(values))))
+    return _result(values, np.abs(a))
+
+
+def round(values, ndigits=None):
+    a = _array(values, "round")
+    if a is None or ndigits is not None or a.dtype.kind == "f" and not np.isfinite(a).all():
+        return _fallback(values, [builtins.round(x, ndigits) for x in _items(values)])
+    if a.dtype.kind != "f":
+        return _result(values, a.astype(np.int64) if a.dtype.kind == "b" else a)
+    rounded = np.rint(a)
+    if builtins.max(builtins.abs(float(rounded.min())), builtins.abs(float(rounded.max()))) >= 2.0 ** 63:
+        return _result(values, np.array([builtins.round(x) for x in a.tolist()], dtype=object))
+    return _result(values, rounded.astype(np.int64))
+
+
+def _pairwise(function: Callable, a, b, *extra) -> list:
+    a, b = _items(a), _items(b)
+    if isinstance(b, numbers.Number):
+        return [function(x, b, *extra) for x in a]
+    return [function(x, y, *extra) for x, y in builtins.zip(a, b)]
+
+
+def _divmod_fallback(a, b):
+    pairs = _pairwise(builtins.divmod, a, b)
+    if np is not None and isinstance(a, np.ndarray):
+        return _fallback(a, [q for q, _ in pairs]), _fallback(a, [r for _, r in pairs])
+    return pairs
+
+
+def divmod(a, b):
+    """Element-wise ``divmod``; ``b`` is a sequence or a single number."""
+    x = _array(a, "divmod")
+    y = _operand(b, "divmod")
+    if x is None or y is None or isinstance(y, np.ndarray) and y.size != x.size:
+        return _divmod_fallback(a, b)
+    if (np.asarray(y) == 0).any():
+        raise ZeroDivisionError("integer division or modulo by zero")
+    ints = x.dtype.kind in "biu" and np.asarray(y).dtype.kind in "biu"
+    if ints:
+        x = _widen(x)
+        y = _widen(y) if isinstance(y, np.ndarray) else y
+        if (np.asarray(y) == -1).any() and int(x.min()) == -(1 << 63):
+            return _divmod_fallback(a, b)
+        # Mixing uint64 with negative divisors promotes to float64 or raises.
+        if np.result_type(x, np.asarray(y)).kind not in "iu" or x.dtype.kind == "u" and (np.asarray(y) < 0).any():
+            return _divmod_fallback(a, b)
+    else:
+        # Python floats are doubles; float32 quotients would round differently.
+        x = x.astype(np.float64)
+    with np.errstate(all="ignore"):
+        # inf and NaN give NaN results silently, as the built-in's do.
+        q, r = np.divmod(x, y)
+    if isinstance(a, np.ndarray):
+        return q, r
+    return list(builtins.zip(q.tolist(), r.tolist()))
+
+
+def pow(base, exp, mod=None):
+    """Element-wise ``pow``; ``exp`` is a sequence or a single number.
+
+    Three-argument ``pow`` stays on the built-in, which is already a
+    modular exponentiation in C.
+    """
+    x = _array(base, "pow")
+    y = _operand(exp, "pow")
+    fallback = mod is not None or x is None or y is None
+    if not fallback:
+        ey = np.asarray(y)
+        if x.dtype.kind in "biu" and ey.dtype.kind in "biu":
+            # Python ints never overflow, and a negative exponent gives a float.
+            top = builtins.max(int(ey.max()), 0)
+            bound = _int_bound(x)
+            fallback = int(ey.min()) < 0 or top > _INT64_MAX or bound > 1 and (top > 63 or bound ** top > _INT64_MAX)
+            if not fallback:
+                x, y = x.astype(np.int64), ey.astype(np.int64)
+        else:
+            # A negative float to a fractional power is complex in Python;
+            # overflow raises instead of giving inf.
+            fractional = ey.dtype.kind == "f" and (ey != np.floor(ey)).any()
+            fallback = bool(fractional and (x < 0).any())
+    if fallback:
+        return _fallback(base, _pairwise(builtins.pow, base, exp, mod))
+    with np.errstate(all="ignore"):
+        out = np.power(x if x.dtype.kind == "i" else x.astype(np.float64), y)
+    if out.dtype.kind == "f" and not np.isfinite(out).all() and np.isfinite(x).all():
+        # Let the built-in raise the OverflowError or ZeroDivisionError.
+        exps = ey.tolist() if ey.ndim else [ey.item()] * x.size
+        return _fallback(base, [builtins.pow(p, q) for p, q in builtins.zip(x.tolist(), exps)])
+    return _result(base, out)
+
+
+def any(iterable):
+    a = _array(iterable, "any")
+    return builtins.any(iterable) if a is None else bool(a.any())
+
+
+def all(iterable):
+    a = _array(iterable, "all")
+    return builtins.all(iterable) if a is None else bool(a.all())
+
+
+# An iterator of tuples has nothing for NumPy to batch; see zip_rows.
+zip = builtins.zip
+
+
+def zip_rows(*iterables):
+    """The tuples ``zip`` would yield, as the rows of one 2-D array.
+
+    Stops at the shortest input like ``zip``, but is eager and needs NumPy.
+    """
+    if np is None:
+        raise RuntimeError("zip_rows needs NumPy")
+    if not iterables:
+        return np.empty((0, 0))
+    arrays = [i if isinstance(i, np.ndarray) else np.asarray(list(i)) for i in iterables]
+    n = builtins.min(a.shape[0] for a in arrays)
+    return np.column_stack([a[:n] for a in arrays])
+
+
+# Crossover benchmark ------------------------------------------------------
+
+def _cases(n: int) -> Dict[str, tuple]:
+    floats = [(i * 7919 % n) / 7.0 for i in range(n)]
+    return {
+        "sum": (builtins.sum, sum, floats),
+        "min": (builtins.min, min, floats),
+        "max": (builtins.max, max, floats),
+        "sorted": (builtins.sorted, sorted, floats),
+        "abs": (lambda v: list(map(builtins.abs, v)), abs, floats),
+        "round": (lambda v: [builtins.round(x) for x in v], round, floats),
+        "divmod": (lambda v: [builtins.divmod(x, 3.0) for x in v], lambda v: divmod(v, 3.0), floats),
+        "pow": (lambda v: [builtins.pow(x, 2.0) for x in v], lambda v: pow(v, 2.0), floats),
+        "any": (builtins.any, any, [0.0] * n),
+        "all": (builtins.all, all, [1.0] * n),
+    }
+
+
+def _best(run: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = builtins.min(best, time.perf_counter() - started)
+    return best
+
+
+def crossover(sizes: Sequence[int] = tuple(10 ** k for k in range(1, 7))) -> List[tuple]:
+    """Time the built-in and the batched version on float lists and arrays.
+
+    Returns ``(name, input, size, builtin seconds, batched seconds)`` rows.
+    The list thresholds are lifted while measuring, so the batched column is
+    NumPy's cost including the conversion.
+    """
+    if np is None:
+        raise RuntimeError("the crossover benchmark needs NumPy")
+    saved = dict(LIST_THRESHOLDS)
+    LIST_THRESHOLDS.update(dict.fromkeys(LIST_THRESHOLDS, 0))
+    rows = []
+    try:
+        for n in sizes:
+            for name, (builtin, batched, values) in _cases(n).items():
+                data = np.array(values)
+                rows.append((name, "list", n, _best(lambda: builtin(values)), _best(lambda: batched(values))))
+                rows.append((name, "ndarray", n, _best(lambda: builtin(data)), _best(lambda: batched(data))))
+    finally:
+        LIST_THRESHOLDS.update(saved)
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.batched", description="Find where the batched built-ins win.")
+    parser.add_argument("--max-size", type=int, default=10 ** 6)
+    args = parser.parse_args(argv)
+
+    sizes = [10 ** k for k in range(1, 9) if 10 ** k <= args.max_size]
+    rows = crossover(sizes)
+    print("| function | input | n | built-in | batched | speedup |")
+    print("|---|---|---|---|---|---|")
+    for name, kind, n, slow, fast in rows:
+        print("| %s | %s | %d | %.3g s | %.3g s | %.1fx |" % (name, kind, n, slow, fast, slow / fast))
+    print()
+    for kind in ("list", "ndarray"):
+        for name in LIST_THRESHOLDS:
+            wins = [n for (f, k, n, slow, fast) in rows if f == name and k == kind and fast < slow]
+            print("%-7s %-8s wins from n=%s" % (name, kind, wins[0] if wins else "never (up to %d)" % sizes[-1]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
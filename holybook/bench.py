@@ -0,0 +1,308 @@
+"""Micro-benchmarks for the built-ins documented in section 2.
+
+Every workload times one book entry (or one of the alternatives the entry
+recommends) over inputs of growing size and of each input type: ``list``,
+``tuple``, a fresh generator per call and, where the values form one,
+``range``.  Results are written as JSON and CSV, and as a markdown summary
+with one table under each entry header.
+
+    python -m holybook.bench --max-size 1000000 --json bench.json --markdown bench.md
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime
+import itertools
+import json
+import math
+import operator
+import platform
+import statistics
+import sys
+import timeit
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+KINDS = ("list", "tuple", "generator", "range")
+SIZES = tuple(10 ** k for k in range(1, 8))
+
+_consume = deque(maxlen=0).extend
+
+
+@dataclass(frozen=True)
+class Workload:
+    """One timed expression.
+
+    ``values(n)`` returns the ``n`` input values, as a ``range`` when they
+    form one so that the ``range`` input type can be benchmarked too.
+    """
+
+    entry: str
+    label: str
+    values: Callable[[int], Sequence]
+    run: Callable[[Iterable], object]
+    max_size: Optional[int] = None
+
+
+@dataclass
+class Result:
+    entry: str
+    label: str
+    kind: str
+    size: int
+    number: int
+    best: float
+    median: float
+
+    @property
+    def per_item_ns(self) -> float:
+        return self.best / self.size * 1e9
+
+
+def _ints(n):
+    return range(n)
+
+
+def _shuffled(n):
+    # A fixed permutation, so that every interpreter sorts the same input.
+    step = 7919 if n % 7919 else 7907
+    return [(i * step) % n for i in range(n)]
+
+
+def _floats(n):
+    return [i / 7 for i in range(n)]
+
+
+def _zeros(n):
+    return [0] * n
+
+
+def _ones(n):
+    return range(1, n + 1)
+
+
+def _lists(n):
+    return [[i] for i in range(n)]
+
+
+def _strings(n):
+    return [str(i % 10) for i in range(n)]
+
+
+def _concat(it):
+    text = ""
+    for item in it:
+        text += item
+    return text
+
+
+def _mod_pow(it):
+    return _consume(pow(x, 64, 1000003) for x in it)
+
+
+def _pow_mod(it):
+    return _consume(pow(x, 64) % 1000003 for x in it)
+
+
+WORKLOADS = (
+    Workload("all", "all(iterable)", _ones, all),
+    Workload("any", "any(iterable)", _zeros, any),
+    Workload("divmod", "map(divmod, iterable, repeat(7))", _ints, lambda it: _consume(map(divmod, it, itertools.repeat(7)))),
+    Workload("enumerate", "enumerate(iterable)", _ints, lambda it: _consume(enumerate(it))),
+    Workload("filter", "filter(None, iterable)", _ints, lambda it: _consume(filter(None, it))),
+    Workload("filter", "filter(function, iterable)", _ints, lambda it: _consume(filter(operator.truth, it))),
+    Workload("filter", "filter(lambda item: item, iterable)", _ints, lambda it: _consume(filter(lambda item: item, it))),
+    Workload("filter", "(item for item in iterable if item)", _ints, lambda it: _consume(item for item in it if item)),
+    Workload("map", "map(abs, iterable)", _ints, lambda it: _consume(map(abs, it))),
+    Workload("map", "(abs(x) for x in iterable)", _ints, lambda it: _consume(abs(x) for x in it)),
+    Workload("max", "max(iterable)", _shuffled, max),
+    Workload("min", "min(iterable)", _shuffled, min),
+    Workload("pow", "pow(base, exp, mod)", _ints, _mod_pow),
+    Workload("pow", "pow(base, exp) % mod", _ints, _pow_mod),
+    Workload("round", "map(round, iterable, repeat(2))", _floats, lambda it: _consume(map(round, it, itertools.repeat(2)))),
+    Workload("sorted", "sorted(iterable)", _shuffled, sorted),
+    Workload("sorted", "sorted(iterable) (presorted)", _ints, sorted),
+    Workload("sum", "sum(iterable)", _ints, sum),
+    Workload("sum", "sum(floats)", _floats, sum),
+    Workload("sum", "math.fsum(floats)", _floats, math.fsum),
+    # Summing lists is quadratic, hence the size cap.
+    Workload("sum", "sum(lists, [])", _lists, lambda it: sum(it, []), max_size=10 ** 4),
+    Workload("sum", "list(itertools.chain.from_iterable(lists))", _lists, lambda it: list(itertools.chain.from_iterable(it)), max_size=10 ** 4),
+    Workload("sum", "''.join(strings)", _strings, "".join),
+    Workload("sum", "text += item (loop)", _strings, _concat),
+    Workload("zip", "zip(iterable, count())", _ints, lambda it: _consume(zip(it, itertools.count()))),
+)
+
+
+def make_input(values: Sequence, kind: str) -> Optional[Callable[[], Iterable]]:
+    """Return a factory producing the input for one call, or ``None``."""
+    if kind == "list":
+        data = list(values)
+        return lambda: data
+    if kind == "tuple":
+        data = tuple(values)
+        return lambda: data
+    if kind == "generator":
+        data = list(values)
+        return lambda: (x for x in data)
+    if kind == "range":
+        if not isinstance(values, range):
+            return None
+        return lambda: values
+    raise ValueError("unknown input kind: %r" % (kind,))
+
+
+def measure(workload: Workload, kind: str, size: int, repeat: int = 5, min_time: float = 0.2) -> Optional[Result]:
+    factory = make_input(workload.values(size), kind)
+    if factory is None:
+        return None
+    run = workload.run
+    timer = timeit.Timer(lambda: run(factory()))
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    times = [t / number for t in timer.repeat(repeat, number)]
+    return Result(workload.entry, workload.label, kind, size, number, min(times), statistics.median(times))
+
+
+def run_suite(
+    sizes: Sequence[int] = SIZES,
+    kinds: Sequence[str] = KINDS,
+    entries: Optional[Sequence[str]] = None,
+    repeat: int = 5,
+    min_time: float = 0.2,
+    progress: Optional[Callable[[Result], None]] = None,
+) -> List[Result]:
+    results = []
+    for workload in WORKLOADS:
+        if entries and workload.entry not in entries:
+            continue
+        for kind in kinds:
+            for size in sizes:
+                if workload.max_size is not None and size > workload.max_size:
+                    continue
+                result = measure(workload, kind, size, repeat, min_time)
+                if result is None:
+                    break
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    return results
+
+
+def metadata() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "executable": sys.executable,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def write_json(results: Sequence[Result], path: str, meta: Optional[Dict[str, str]] = None) -> None:
+    document = {"meta": meta or metadata(), "results": [asdict(r) for r in results]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=1)
+        f.write("\n")
+
+
+def read_json(path: str) -> List[Result]:
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+    return [Result(**row) for row in document["results"]]
+
+
+def write_csv(results: Sequence[Result], path: str) -> None:
+    fields = ["entry", "label", "kind", "size", "number", "best", "median", "per_item_ns"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for r in results:
+            writer.writerow([r.entry, r.label, r.kind, r.size, r.number, r.best, r.median, r.per_item_ns])
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return "%.3g %s" % (seconds / scale, unit)
+    return "%.3g ns" % (seconds / 1e-9)
+
+
+def render_markdown(results: Sequence[Result], meta: Optional[Dict[str, str]] = None) -> str:
+    """Render one table per book entry, headed by the entry as the book spells it."""
+    from holybook.book import find_entry, load_entries
+
+    entries = load_entries()
+    sizes = sorted({r.size for r in results})
+    grouped: Dict[str, Dict[tuple, Dict[int, Result]]] = {}
+    for r in results:
+        grouped.setdefault(r.entry, {}).setdefault((r.label, r.kind), {})[r.size] = r
+
+    out = []
+    if meta:
+        out.append("Measured with %s %s on %s.\n" % (meta["implementation"], meta["python"], meta["platform"]))
+    for name in sorted(grouped, key=lambda n: _book_order(entries, n)):
+        entry = find_entry(entries, name)
+        out.append(entry.header if entry is not None else "**%s**" % name)
+        out.append("")
+        out.append("| expression | input | " + " | ".join("n=%d" % s for s in sizes) + " |")
+        out.append("|---|---|" + "---|" * len(sizes))
+        for (label, kind), by_size in grouped[name].items():
+            cells = [format_time(by_size[s].best) if s in by_size else "" for s in sizes]
+            out.append("| `%s` | %s | %s |" % (label, kind, " | ".join(cells)))
+        out.append("")
+    return "\n".join(out)
+
+
+def _book_order(entries, name):
+    for i, entry in enumerate(entries):
+        if name in entry.names:
+            return i
+    return len(entries)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.bench", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--max-size", type=int, help="drop the sizes above this one")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--entries", nargs="+", help="only benchmark these entries")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing loop")
+    parser.add_argument("--json", help="write the results as JSON")
+    parser.add_argument("--csv", help="write the results as CSV")
+    parser.add_argument("--markdown", help="write the per-entry summary tables")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    sizes = [s for s in args.sizes if args.max_size is None or s <= args.max_size]
+
+    def progress(r: Result) -> None:
+        if not args.quiet:
+            print("%-10s %-45s %-9s %9d %12s" % (r.entry, r.label, r.kind, r.size, format_time(r.best)), file=sys.stderr)
+
+    meta = metadata()
+    results = run_suite(sizes, args.kinds, args.entries, args.repeat, args.min_time, progress)
+    if args.json:
+        write_json(results, args.json, meta)
+    if args.csv:
+        write_csv(results, args.csv)
+    report = render_markdown(results, meta)
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(report)
+    elif not (args.json or args.csv):
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Parse the Holy Book into entries.
+
+The book is kept twice, as a Jupyter notebook and as its nbconvert ``.py``
+export.  Both are read into the same list of :class:`Cell` objects, and
+:func:`parse_entries` turns the markdown cells into :class:`Entry` objects:
+one per ``**name (signature)**`` header together with its ``>`` body lines.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from holybook import BOOK_IPYNB, BOOK_PY
+
+_SECTION = re.compile(r"^#{2,}\s+(\d+(?:\.\d+)*)\.?\s")
+_HEADER = re.compile(r"^\*\*(?:class\s+)?@?(?:[A-Za-z_]|\\_)")
+_NAME = re.compile(r"^(?:class\s+)?(@?[\w.]+)")
+_ALTERNATIVE = re.compile(r"\*\*\s+or\s+\*\*")
+_ESCAPE = re.compile(r"\\([\\`*_{}\[\]()#+\-.!])")
+_CODE_MARKER = re.compile(r"^# In\[[ \d]*\]:$")
+
+
+@dataclass(frozen=True)
+class Cell:
+    """One notebook cell.
+
+    ``offset`` is the 0-based line in the ``.py`` export holding the first
+    source line of the cell; it is ``None`` for cells read from the notebook.
+    """
+
+    index: int
+    cell_type: str
+    source: str
+    offset: Optional[int] = None
+
+    @property
+    def lines(self) -> List[str]:
+        return self.source.split("\n")
+
+
+@dataclass(frozen=True)
+class Entry:
+    """A documented name with its signatures and markdown body.
+
+    ``start`` and ``end`` delimit the entry (headers included, trailing blank
+    lines excluded) as a half-open range of lines in ``cell``.
+    """
+
+    name: str
+    signatures: Tuple[str, ...]
+    section: str
+    cell: Cell
+    start: int
+    end: int
+    aliases: Tuple[str, ...] = ()
+    body_start: int = field(default=0, repr=False)
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return (self.name,) + self.aliases
+
+    @property
+    def header(self) -> str:
+        return "\n".join(self.cell.lines[self.start:self.body_start])
+
+    @property
+    def body(self) -> str:
+        return "\n".join(self.cell.lines[self.body_start:self.end])
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.cell.lines[self.start:self.end])
+
+    @property
+    def lineno(self) -> Optional[int]:
+        """1-based line of the header in the ``.py`` export, if known."""
+        if self.cell.offset is None:
+            return None
+        return self.cell.offset + self.start + 1
+
+
+def unescape(text: str) -> str:
+    """Drop the markdown backslash escapes (``\\_\\_abs\\_\\_`` -> ``__abs__``)."""
+    return _ESCAPE.sub(r"\1", text)
+
+
+def read_ipynb_cells(path: Path = BOOK_IPYNB) -> List[Cell]:
+    with open(path, encoding="utf-8") as f:
+        notebook = json.load(f)
+    return [
+        Cell(index, cell["cell_type"], "".join(cell["source"]))
+        for index, cell in enumerate(notebook["cells"])
+    ]
+
+
+def read_py_cells(path: Path = BOOK_PY) -> List[Cell]:
+    """Read the cells back out of an nbconvert ``.py`` export."""
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    return split_py_cells(lines)
+
+
+def split_py_cells(lines: Sequence[str]) -> List[Cell]:
+    cells = []
+    i = 0
+    # Skip the shebang and coding lines written by nbconvert.
+    while i < len(lines) and (lines[i].startswith("#!") or lines[i].startswith("# coding")):
+        i += 1
+    while i < len(lines):
+        if not lines[i].strip():
+            i += 1
+            continue
+        if _CODE_MARKER.match(lines[i]):
+            # Code cells are surrounded by two blank lines on either side.
+            start = i + 3
+            end = start
+            while end < len(lines) and not _next_cell_starts(lines, end):
+                end += 1
+            body = list(lines[start:end])
+            while body and not body[-1].strip():
+                body.pop()
+            cells.append(Cell(len(cells), "code", "\n".join(body), start))
+            i = end
+            continue
+        start = i
+        while i < len(lines) and lines[i].startswith("#"):
+            i += 1
+        source = "\n".join(_uncomment(line) for line in lines[start:i])
+        cells.append(Cell(len(cells), "markdown", source, start))
+    return cells
+
+
+def _uncomment(line: str) -> str:
+    if line.startswith("# "):
+        return line[2:]
+    return line[1:]
+
+
+def _next_cell_starts(lines: Sequence[str], i: int) -> bool:
+    if _CODE_MARKER.match(lines[i]):
+        return True
+    # A markdown cell after a code cell follows two blank lines.
+    return i >= 2 and lines[i].startswith("#") and not lines[i - 1].strip() and not lines[i - 2].strip()
+
+
+def read_cells(path: Optional[Path] = None) -> List[Cell]:
+    path = Path(path) if path is not None else BOOK_PY
+    if path.suffix == ".ipynb":
+        return read_ipynb_cells(path)
+    return read_py_cells(path)
+
+
+def is_header(line: str) -> bool:
+    return bool(_HEADER.match(line.strip()))
+
+
+def parse_header(line: str) -> List[str]:
+    """Return the signatures spelled by one header line.
+
+    ``**class dict (\\*\\*kwarg)** or **class dict (mapping, **kwarg)**`` gives
+    two signatures and ``**quit** (code = None)`` gives ``quit (code = None)``.
+    """
+    signatures = []
+    for alternative in _ALTERNATIVE.split(line.strip()):
+        alternative = alternative.strip()
+        if alternative.startswith("**"):
+            alternative = alternative[2:]
+        if alternative.endswith("**"):
+            alternative = alternative[:-2]
+        else:
+            alternative = re.sub(r"^((?:class\s+)?@?[\w\\]+)\*\*", r"\1", alternative)
+        signatures.append(unescape(alternative).strip())
+    return signatures
+
+
+def signature_name(signature: str) -> str:
+    match = _NAME.match(signature)
+    return match.group(1) if match else signature
+
+
+def heading_section(cell: Cell) -> Optional[str]:
+    """The section number a heading cell opens (``"3.1"``), else ``None``."""
+    if cell.cell_type != "markdown":
+        return None
+    match = _SECTION.match(cell.source)
+    return match.group(1) if match else None
+
+
+def parse_entries(cells: Iterable[Cell], section: str = "") -> List[Entry]:
+    """Parse the entries of ``cells``; ``section`` is the one open before them."""
+    entries: List[Entry] = []
+    for cell in cells:
+        if cell.cell_type != "markdown":
+            continue
+        heading = heading_section(cell)
+        if heading is not None:
+            section = heading
+            continue
+        lines = cell.lines
+        current = None
+        for i, line in enumerate(lines):
+            if is_header(line):
+                signatures = parse_header(line)
+                names = [signature_name(s) for s in signatures]
+                if current is not None and _is_blank(lines[current["body_start"]:i]):
+                    # Headers sharing one body, e.g. the two ``max`` forms or
+                    # ``quit``/``exit``.
+                    current["signatures"].extend(signatures)
+                    current["names"].extend(n for n in names if n not in current["names"])
+                    current["body_start"] = i + 1
+                    continue
+                if current is not None:
+                    entries.append(_make_entry(current, cell, section, i))
+                current = {"signatures": signatures, "names": _unique(names), "start": i, "body_start": i + 1}
+        if current is not None:
+            entries.append(_make_entry(current, cell, section, len(lines)))
+    return entries
+
+
+def _make_entry(current: dict, cell: Cell, section: str, end: int) -> Entry:
+    lines = cell.lines
+    while end > current["body_start"] and not lines[end - 1].strip():
+        end -= 1
+    names = current["names"]
+    return Entry(
+        name=names[0],
+        signatures=tuple(current["signatures"]),
+        section=section,
+        cell=cell,
+        start=current["start"],
+        end=end,
+        aliases=tuple(names[1:]),
+        body_start=current["body_start"],
+    )
+
+
+def _is_blank(lines: Sequence[str]) -> bool:
+    return all(not line.strip() for line in lines)
+
+
+def _unique(names: Iterable[str]) -> List[str]:
+    seen: List[str] = []
+    for name in names:
+        if name not in seen:
+            seen.append(name)
+    return seen
+
+
+def load_entries(path: Optional[Path] = None) -> List[Entry]:
+    return parse_entries(read_cells(path))
+
+
+def find_entry(entries: Iterable[Entry], name: str) -> Optional[Entry]:
+    """Look an entry up by name, alias or decorator spelling (``classmethod``)."""
+    wanted = name.strip().lstrip("@")
+    for entry in entries:
+        if any(n.lstrip("@") == wanted for n in entry.names):
+            return entry
+    return None
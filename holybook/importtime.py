@@ -0,0 +1,280 @@
+"""Find what a module's import costs, and defer what it does not need.
+
+:func:`profile_imports` imports a target module in a fresh interpreter under
+``-X importtime`` and parses the report into a tree of :class:`ImportNode`
+with self and cumulative times.  :func:`unused_at_startup` goes further: it
+imports the target, then runs a workload (a ``module:function`` to call or a
+snippet of code) while watching which of the modules imported at startup are
+touched, and returns the rest.
+
+Those modules are the candidates for the lazy-import layer.  The
+``__import__`` entry points at import hooks (PEP 302) as the supported way to
+change how imports behave, and :func:`install_lazy` adds one: a meta path
+finder that hands the listed modules to ``importlib.util.LazyLoader``, so
+``import json`` binds a module whose code runs on first attribute access.
+
+    python -m holybook.importtime mycli --call mycli.main:run
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import json
+import os
+import re
+import subprocess
+import sys
+from types import ModuleType
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+class ImportNode:
+    """One module in the import tree; times are in microseconds."""
+
+    __slots__ = ("name", "self_us", "cumulative_us", "depth", "children")
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, depth: int):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+        self.children: List["ImportNode"] = []
+
+    def __repr__(self) -> str:
+        return "ImportNode(%r, self_us=%d, cumulative_us=%d)" % (self.name, self.self_us, self.cumulative_us)
+
+    def walk(self) -> Iterator["ImportNode"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def parse_importtime(text: str) -> List[ImportNode]:
+    """Build the import forest from ``-X importtime`` output.
+
+    The report lists a module after everything it imported, one level of
+    indentation (two spaces) deeper per level of nesting.
+    """
+    pending: List[ImportNode] = []
+    for line in text.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        node = ImportNode(name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2)
+        split = len(pending)
+        while split and pending[split - 1].depth > node.depth:
+            split -= 1
+        node.children = pending[split:]
+        del pending[split:]
+        pending.append(node)
+    return pending
+
+
+def _environment() -> dict:
+    env = dict(os.environ)
+    path = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = os.getcwd() + (os.pathsep + path if path else "")
+    return env
+
+
+def profile_imports(module: str, python: str = sys.executable) -> List[ImportNode]:
+    """Import ``module`` under ``-X importtime`` and return the forest.
+
+    Only the modules imported by ``module`` are returned, not those the
+    interpreter itself loads at startup.
+    """
+    done = subprocess.run(
+        [python, "-X", "importtime", "-c", "import %s" % module],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, env=_environment(),
+    )
+    if done.returncode:
+        raise RuntimeError("importing %s failed:\n%s" % (module, done.stderr[-2000:]))
+    forest = parse_importtime(done.stderr)
+    top = module.split(".")[0]
+    return [node for node in forest if node.name.split(".")[0] == top] or forest
+
+
+# Runs in the child interpreter: import the target, then record which of the
+# modules it pulled in are touched by the workload.  Nothing but ``sys`` is
+# imported before the target, so the driver's own imports are not mistaken
+# for the target's.
+_DRIVER = r"""
+import sys
+before = set(sys.modules)
+__import__(sys.argv[1])
+imported = set(sys.modules) - before
+import json
+ModuleType = type(sys)
+module = sys.argv[1]
+call, code = json.loads(sys.argv[2])
+touched = set()
+
+class Watched(ModuleType):
+    def __getattribute__(self, attr):
+        name = ModuleType.__getattribute__(self, "__name__")
+        touched.add(name)
+        return ModuleType.__getattribute__(self, attr)
+
+watched = []
+for name, mod in list(sys.modules.items()):
+    if name in imported and type(mod) is ModuleType:
+        try:
+            mod.__class__ = Watched
+        except TypeError:
+            continue
+        watched.append(name)
+touched.clear()
+if call:
+    target, _, function = call.partition(":")
+    __import__(target)
+    getattr(sys.modules[target], function)()
+if code:
+    exec(compile(code, "<workload>", "exec"), {"__name__": "__workload__"})
+result = {"watched": watched, "touched": sorted(touched)}
+print("\n" + json.dumps(result))
+"""
+
+
+def unused_at_startup(
+    module: str,
+    call: Optional[str] = None,
+    code: Optional[str] = None,
+    python: str = sys.executable,
+) -> List[str]:
+    """Modules ``module`` imports that the workload never touches.
+
+    A module counts as touched when any attribute of it is read.  Names bound
+    with ``from x import y`` at startup never read ``x`` again, so ``x`` can
+    show up here although its functions are used; check before deferring it.
+    """
+    done = subprocess.run(
+        [python, "-c", _DRIVER, module, json.dumps([call, code])],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, env=_environment(),
+    )
+    if done.returncode:
+        raise RuntimeError("running the workload failed:\n%s" % done.stderr[-2000:])
+    result = json.loads(done.stdout.rstrip().rsplit("\n", 1)[-1])
+    touched = set(result["touched"])
+    own = set(_ancestors(module)) | {module}
+    return [name for name in result["watched"] if name not in touched and name not in own]
+
+
+def _ancestors(module: str) -> List[str]:
+    """The packages ``module`` is imported through: ``a`` and ``a.b`` for ``a.b.c``."""
+    parts = module.split(".")
+    return [".".join(parts[:i]) for i in range(1, len(parts))]
+
+
+# The lazy-import layer ----------------------------------------------------
+
+def lazy_import(name: str) -> ModuleType:
+    """Import ``name`` now but run its code on first attribute access."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError("No module named %r" % name, name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class LazyFinder(importlib.abc.MetaPathFinder):
+    """Meta path finder that makes the imports of ``names`` lazy."""
+
+    def __init__(self, names: Iterable[str]):
+        self.names = set(names)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in self.names:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        # Only loaders that split module creation from execution can be deferred.
+        if spec.loader is None or not hasattr(spec.loader, "exec_module") or isinstance(
+            spec.loader, (importlib.machinery.BuiltinImporter, importlib.machinery.FrozenImporter)
+        ):
+            return spec
+        spec.loader = importlib.util.LazyLoader(spec.loader)
+        return spec
+
+
+def install_lazy(names: Iterable[str]) -> LazyFinder:
+    """Make later imports of ``names`` lazy; returns the finder to uninstall."""
+    finder = LazyFinder(names)
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+def uninstall_lazy(finder: LazyFinder) -> None:
+    if finder in sys.meta_path:
+        sys.meta_path.remove(finder)
+
+
+# Report -------------------------------------------------------------------
+
+def format_tree(forest: Sequence[ImportNode], min_us: int = 1000, max_depth: int = 3) -> str:
+    lines = []
+
+    def visit(node: ImportNode, depth: int) -> None:
+        if node.cumulative_us < min_us or depth > max_depth:
+            return
+        lines.append("%9.1f ms %9.1f ms  %s%s" % (node.cumulative_us / 1e3, node.self_us / 1e3, "  " * depth, node.name))
+        for child in sorted(node.children, key=lambda c: -c.cumulative_us):
+            visit(child, depth + 1)
+
+    lines.append("%12s %12s  %s" % ("cumulative", "self", "module"))
+    for root in sorted(forest, key=lambda n: -n.cumulative_us):
+        visit(root, 0)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.importtime", description="Analyze a module's import time.")
+    parser.add_argument("module")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to run (default: this one)")
+    parser.add_argument("--call", metavar="MODULE:FUNCTION", help="workload to run after the import")
+    parser.add_argument("--exec", dest="code", metavar="CODE", help="workload code to run after the import")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="hide modules cheaper than this")
+    parser.add_argument("--depth", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    forest = profile_imports(args.module, args.python)
+    print(format_tree(forest, int(args.min_ms * 1000), args.depth))
+    if not (args.call or args.code):
+        return 0
+
+    unused = set(unused_at_startup(args.module, args.call, args.code, args.python))
+    # Only the target's own imports can be made lazy by the target, and not
+    # the packages it is imported through.
+    own = set(_ancestors(args.module))
+    direct = [child for root in forest if root.name == args.module for child in root.children if child.name not in own]
+    candidates = sorted((c for c in direct if c.name in unused), key=lambda c: -c.cumulative_us)
+    print()
+    print("Imported by %s at startup but not used by the workload:" % args.module)
+    for node in candidates:
+        print("%9.1f ms  %s" % (node.cumulative_us / 1e3, node.name))
+    if candidates:
+        print()
+        print("To defer them, before %s is imported:" % args.module)
+        print("    from holybook.importtime import install_lazy")
+        print("    install_lazy(%r)" % ([c.name for c in candidates],))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
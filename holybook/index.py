@@ -0,0 +1,228 @@
+"""Compiled entry index, read through ``mmap``.
+
+``build`` parses the book once and writes a compact binary file holding, for
+every entry, its name, signatures, section, line in the ``.py`` export and
+markdown body.  :class:`EntryIndex` maps that file and binary-searches a
+sorted key table, so a lookup decodes only the one entry it returns.
+
+Layout (little-endian)::
+
+    header   magic "HBIX", version, key count, entry count, source size
+             and mtime (to tell when the index is stale), source path
+             as an (offset, length) pair
+    keys     (blob offset, length, entry number), sorted by key
+    entries  (name, signatures, section, body) as (offset, length) pairs + line
+    blob     UTF-8 strings
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from holybook import BOOK_PY, CACHE_DIR
+
+MAGIC = b"HBIX"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIIQQII")
+KEY = struct.Struct("<IHI")
+ENTRY = struct.Struct("<IIIIIIIII")
+
+DEFAULT_INDEX = CACHE_DIR / "entries.idx"
+
+
+class IndexedEntry(NamedTuple):
+    name: str
+    signatures: Tuple[str, ...]
+    section: str
+    line: int
+    body: str
+
+
+def normalize(name: str) -> str:
+    return name.strip().lstrip("@").casefold()
+
+
+def build(source: Optional[Path] = None, path: Path = DEFAULT_INDEX) -> int:
+    """Compile ``source`` (the ``.py`` export or the notebook) into ``path``.
+
+    Returns the number of entries written.
+    """
+    from holybook.book import load_entries
+
+    source = Path(source) if source is not None else BOOK_PY
+    entries = load_entries(source)
+
+    blob = bytearray()
+
+    def add(text: str) -> Tuple[int, int]:
+        data = text.encode("utf-8")
+        offset = len(blob)
+        blob.extend(data)
+        return offset, len(data)
+
+    records = []
+    keys = {}
+    for number, entry in enumerate(entries):
+        fields = add(entry.name) + add("\n".join(entry.signatures)) + add(entry.section) + add(entry.body)
+        records.append(ENTRY.pack(*fields, entry.lineno or 0))
+        for name in entry.names:
+            keys.setdefault(normalize(name), number)
+
+    source = source.resolve()
+    source_field = add(str(source))
+    key_records = []
+    for key in sorted(keys):
+        offset, length = add(key)
+        key_records.append(KEY.pack(offset, length, keys[key]))
+
+    stat = source.stat()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(key_records), len(records), stat.st_size, stat.st_mtime_ns, *source_field))
+        f.writelines(key_records)
+        f.writelines(records)
+        f.write(blob)
+    os.replace(tmp, path)
+    return len(records)
+
+
+def _read_header(path: Path) -> Optional[Tuple[int, int, Path]]:
+    """The source size, mtime and path recorded in ``path``, if it is an index."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, _, key_count, entry_count, size, mtime, offset, length = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            f.seek(HEADER.size + key_count * KEY.size + entry_count * ENTRY.size + offset)
+            source = Path(f.read(length).decode("utf-8"))
+    except (OSError, struct.error, UnicodeDecodeError):
+        return None
+    return size, mtime, source
+
+
+def indexed_source(path: Path = DEFAULT_INDEX) -> Optional[Path]:
+    """The book ``path`` was compiled from, or ``None`` if it is unreadable."""
+    header = _read_header(path)
+    return None if header is None else header[2]
+
+
+def is_stale(path: Path = DEFAULT_INDEX, source: Optional[Path] = None) -> bool:
+    """True when ``path`` is missing, unreadable or older than its source.
+
+    The source is the book ``path`` was compiled from, unless ``source``
+    names a different one.
+    """
+    header = _read_header(path)
+    if header is None:
+        return True
+    size, mtime, indexed = header
+    if source is not None and Path(source).resolve() != indexed:
+        return True
+    try:
+        stat = indexed.stat()
+    except OSError:
+        return True
+    return (size, mtime) != (stat.st_size, stat.st_mtime_ns)
+
+
+class EntryIndex:
+    """Read-only view of a compiled index."""
+
+    def __init__(self, path: Path = DEFAULT_INDEX):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._key_count, self._entry_count = HEADER.unpack_from(self._map, 0)[:5]
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("%s is not a version %d entry index" % (path, VERSION))
+        self._keys = HEADER.size
+        self._entries = self._keys + self._key_count * KEY.size
+        self._blob = self._entries + self._entry_count * ENTRY.size
+
+    def __enter__(self) -> "EntryIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __len__(self) -> int:
+        return self._entry_count
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._blob + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def _key(self, i: int) -> Tuple[bytes, int]:
+        offset, length, number = KEY.unpack_from(self._map, self._keys + i * KEY.size)
+        start = self._blob + offset
+        return self._map[start:start + length], number
+
+    def entry(self, number: int) -> IndexedEntry:
+        fields = ENTRY.unpack_from(self._map, self._entries + number * ENTRY.size)
+        name, signatures, section, body = (self._string(*fields[i:i + 2]) for i in range(0, 8, 2))
+        return IndexedEntry(name, tuple(signatures.split("\n")), section, fields[8], body)
+
+    def find(self, name: str) -> Optional[int]:
+        """Return the entry number for ``name``, or ``None``."""
+        wanted = normalize(name).encode("utf-8")
+        lo, hi = 0, self._key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, number = self._key(mid)
+            if key < wanted:
+                lo = mid + 1
+            elif key > wanted:
+                hi = mid
+            else:
+                return number
+        return None
+
+    def lookup(self, name: str) -> Optional[IndexedEntry]:
+        number = self.find(name)
+        return None if number is None else self.entry(number)
+
+    def names(self) -> Iterator[str]:
+        for i in range(self._key_count):
+            yield self._key(i)[0].decode("utf-8")
+
+    def complete(self, prefix: str) -> List[str]:
+        """Keys starting with ``prefix``, for editor completion."""
+        wanted = normalize(prefix).encode("utf-8")
+        lo, hi = 0, self._key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[0] < wanted:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        for i in range(lo, self._key_count):
+            key = self._key(i)[0]
+            if not key.startswith(wanted):
+                break
+            found.append(key.decode("utf-8"))
+        return found
+
+
+def open_index(path: Path = DEFAULT_INDEX, source: Optional[Path] = None) -> EntryIndex:
+    """Open ``path``, building it first if it is missing or stale.
+
+    A stale index is rebuilt from ``source``, else from the book it was
+    compiled from, else from the ``.py`` export.
+    """
+    if is_stale(path, source):
+        if source is None:
+            source = indexed_source(path)
+            if source is not None and not source.exists():
+                source = None
+        build(source, path)
+    return EntryIndex(path)
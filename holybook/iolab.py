@@ -0,0 +1,344 @@
+"""Read and write throughput of ``open()``, and a reader built on the results.
+
+The ``open()`` entry documents ``buffering`` (``0`` unbuffered, binary only;
+``1`` line buffered, text only; ``-1`` the default; any other value a buffer
+size) and text vs binary modes.  :func:`run_lab` measures those choices, plus
+``readinto`` into a reused buffer and ``mmap``, on files from 4 KiB up to
+2 GiB.  Files are read right after being written, so the read numbers are
+for a warm page cache.
+
+:func:`iter_chunks`, :func:`iter_line_blocks` and :func:`iter_lines` are
+the reader the measurements point to: unbuffered ``readinto`` into one reused
+``bytearray``, handing out ``memoryview`` slices instead of copies.
+
+    python -m holybook.iolab --max-size 64M --markdown io.md
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+KiB = 1 << 10
+MiB = 1 << 20
+GiB = 1 << 30
+SIZES = (4 * KiB, 64 * KiB, MiB, 16 * MiB, 256 * MiB, 2 * GiB)
+DEFAULT_CHUNK = MiB
+LINE = b"x" * 79 + b"\n"
+
+_SIZE = re.compile(r"^(\d+)([KMG]?)(?:i?B)?$", re.IGNORECASE)
+
+
+class Result(NamedTuple):
+    op: str
+    case: str
+    size: int
+    seconds: float
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.size / MiB / self.seconds if self.seconds else float("inf")
+
+
+def parse_size(text: str) -> int:
+    """``"4K"`` -> 4096, ``"2G"`` -> 2147483648."""
+    match = _SIZE.match(text.strip())
+    if match is None:
+        raise ValueError("not a size: %r" % (text,))
+    number, unit = match.groups()
+    return int(number) * {"": 1, "K": KiB, "M": MiB, "G": GiB}[unit.upper()]
+
+
+def format_size(size: int) -> str:
+    for unit, scale in (("GiB", GiB), ("MiB", MiB), ("KiB", KiB)):
+        if size >= scale and size % scale == 0:
+            return "%d %s" % (size // scale, unit)
+    return "%d B" % size
+
+
+# The reader ----------------------------------------------------------------
+
+def _buffer_size(f, chunk_size: int) -> int:
+    # No point allocating a large buffer for a small file.
+    try:
+        size = os.fstat(f.fileno()).st_size
+    except OSError:
+        return chunk_size
+    return max(1, min(chunk_size, size + 1))
+
+
+def iter_chunks(path, chunk_size: int = DEFAULT_CHUNK) -> Iterator[memoryview]:
+    """Yield the file as ``memoryview`` slices of one reused buffer.
+
+    Each view is only valid until the next one is requested; copy it with
+    ``bytes(view)`` to keep it.
+    """
+    with open(path, "rb", buffering=0) as f:
+        buffer = bytearray(_buffer_size(f, chunk_size))
+        view = memoryview(buffer)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            yield view[:n]
+
+
+def iter_line_blocks(path, chunk_size: int = DEFAULT_CHUNK) -> Iterator[memoryview]:
+    """Yield runs of whole lines as ``memoryview`` slices of a reused buffer.
+
+    Every view ends just after a newline (except perhaps the last one), so it
+    can be handed to ``bytes.splitlines``, ``bytes.count`` or a parser without
+    ever splitting a record.  Only the partial line at the end of each read
+    is moved; a line longer than ``chunk_size`` makes the buffer grow.  Each
+    view is only valid until the next one is requested.
+    """
+    with open(path, "rb", buffering=0) as f:
+        buffer = bytearray(_buffer_size(f, chunk_size))
+        view = memoryview(buffer)
+        pending = 0
+        while True:
+            if pending == len(buffer):
+                # The buffer may still be exported to the caller, so grow
+                # by copying into a new one rather than resizing.
+                buffer = buffer + bytearray(len(buffer))
+                view = memoryview(buffer)
+            n = f.readinto(view[pending:])
+            if not n:
+                if pending:
+                    yield view[:pending]
+                return
+            end = pending + n
+            cut = buffer.rfind(b"\n", pending, end) + 1
+            if cut:
+                yield view[:cut]
+            pending = end - cut
+            buffer[:pending] = buffer[cut:end]
+
+
+def iter_lines(path, chunk_size: int = DEFAULT_CHUNK, keepends: bool = False) -> Iterator[bytes]:
+    """Yield the lines of a file as ``bytes``, split a block at a time.
+
+    A convenience over :func:`iter_line_blocks`: resuming the generator for
+    every line costs more than the split itself, so code that can work on a
+    block of lines at once should use the blocks directly.
+    """
+    for block in iter_line_blocks(path, chunk_size):
+        yield from block.tobytes().splitlines(keepends)
+
+
+# The measurements ----------------------------------------------------------
+
+def make_file(path, size: int) -> None:
+    """Write ``size`` bytes of 80-byte lines to ``path``."""
+    block = LINE * (MiB // len(LINE))
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+
+
+def _read_text(buffering: int) -> Callable[[str], int]:
+    def read(path: str) -> int:
+        count = 0
+        with open(path, "r", buffering=buffering, encoding="ascii") as f:
+            for line in f:
+                count += len(line)
+        return count
+    return read
+
+
+def _read_binary(buffering: int, chunk_size: int = 64 * KiB) -> Callable[[str], int]:
+    def read(path: str) -> int:
+        count = 0
+        with open(path, "rb", buffering=buffering) as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                count += len(data)
+        return count
+    return read
+
+
+def _read_binary_lines(path: str) -> int:
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            count += len(line)
+    return count
+
+
+def _readinto(path: str) -> int:
+    count = 0
+    for chunk in iter_chunks(path):
+        count += len(chunk)
+    return count
+
+
+def _iter_lines(path: str) -> int:
+    count = 0
+    for line in iter_lines(path, keepends=True):
+        count += len(line)
+    return count
+
+
+def _iter_line_blocks(path: str) -> int:
+    count = 0
+    for block in iter_line_blocks(path):
+        count += len(block)
+    return count
+
+
+def _mmap(path: str) -> int:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            count = 0
+            for start in range(0, len(m), DEFAULT_CHUNK):
+                count += len(m[start:start + DEFAULT_CHUNK])
+            return count
+
+
+def _write_text(buffering: int) -> Callable[[str, int], None]:
+    line = LINE.decode("ascii")
+
+    def write(path: str, size: int) -> None:
+        with open(path, "w", buffering=buffering, encoding="ascii") as f:
+            for _ in range(size // len(line)):
+                f.write(line)
+    return write
+
+
+def _write_binary(buffering: int) -> Callable[[str, int], None]:
+    def write(path: str, size: int) -> None:
+        with open(path, "wb", buffering=buffering) as f:
+            for _ in range(size // len(LINE)):
+                f.write(LINE)
+    return write
+
+
+def _write_binary_chunks(path: str, size: int) -> None:
+    make_file(path, size)
+
+
+READS: Dict[str, Callable[[str], int]] = {
+    "text lines, buffering=-1": _read_text(-1),
+    "text lines, buffering=1 MiB": _read_text(MiB),
+    "binary lines, buffering=-1": _read_binary_lines,
+    "binary read(64 KiB), buffering=0": _read_binary(0),
+    "binary read(64 KiB), buffering=-1": _read_binary(-1),
+    "binary read(64 KiB), buffering=1 MiB": _read_binary(MiB),
+    "readinto reused bytearray (iter_chunks)": _readinto,
+    "whole-line blocks (iter_line_blocks)": _iter_line_blocks,
+    "bytes lines (iter_lines)": _iter_lines,
+    "mmap": _mmap,
+}
+
+WRITES: Dict[str, Callable[[str, int], None]] = {
+    "text lines, buffering=1 (line buffered)": _write_text(1),
+    "text lines, buffering=-1": _write_text(-1),
+    "text lines, buffering=1 MiB": _write_text(MiB),
+    "binary lines, buffering=0": _write_binary(0),
+    "binary lines, buffering=-1": _write_binary(-1),
+    "binary 1 MiB blocks": _write_binary_chunks,
+}
+
+# Writing one syscall per line gets slow quickly; cap those cases.
+SLOW_WRITES = {"text lines, buffering=1 (line buffered)": 16 * MiB, "binary lines, buffering=0": 16 * MiB}
+
+
+def run_lab(
+    sizes: Sequence[int] = SIZES,
+    directory: Optional[str] = None,
+    repeat: int = 3,
+    progress: Optional[Callable[[Result], None]] = None,
+) -> List[Result]:
+    """Time every read and write case on a scratch file of each size."""
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory, prefix="holybook-io-") as scratch:
+        path = os.path.join(scratch, "data.txt")
+        for size in sizes:
+            for case, write in WRITES.items():
+                if size > SLOW_WRITES.get(case, size):
+                    continue
+                results.append(_time("write", case, size, lambda: write(path, size), repeat, progress))
+            make_file(path, size)
+            for case, read in READS.items():
+                results.append(_time("read", case, size, lambda: read(path), repeat, progress))
+            os.remove(path)
+    return results
+
+
+def _time(op, case, size, action, repeat, progress) -> Result:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    result = Result(op, case, size, best)
+    if progress is not None:
+        progress(result)
+    return result
+
+
+def render_markdown(results: Sequence[Result]) -> str:
+    """One throughput table (MiB/s) per operation, with a column per size."""
+    sizes = sorted({r.size for r in results})
+    out = []
+    for op in ("read", "write"):
+        rows: Dict[str, Dict[int, Result]] = {}
+        for r in results:
+            if r.op == op:
+                rows.setdefault(r.case, {})[r.size] = r
+        if not rows:
+            continue
+        out.append("| %s (MiB/s) | %s |" % (op, " | ".join(format_size(s) for s in sizes)))
+        out.append("|---|" + "---|" * len(sizes))
+        for case, by_size in rows.items():
+            cells = ["%.0f" % by_size[s].mb_per_s if s in by_size else "" for s in sizes]
+            out.append("| %s | %s |" % (case, " | ".join(cells)))
+        out.append("")
+    return "\n".join(out)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.iolab", description="Measure open() read/write throughput.")
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=list(SIZES), help="e.g. 4K 1M 2G")
+    parser.add_argument("--max-size", type=parse_size, help="drop the sizes above this one")
+    parser.add_argument("--dir", help="where to put the scratch files (default: the temp directory)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write the results as JSON")
+    parser.add_argument("--markdown", help="write the throughput tables")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    sizes = [s for s in args.sizes if args.max_size is None or s <= args.max_size]
+
+    def progress(r: Result) -> None:
+        if not args.quiet:
+            print("%-5s %-42s %9s %10.1f MiB/s" % (r.op, r.case, format_size(r.size), r.mb_per_s), file=sys.stderr)
+
+    results = run_lab(sizes, args.dir, args.repeat, progress)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([dict(r._asdict(), mb_per_s=r.mb_per_s) for r in results], f, indent=1)
+    report = render_markdown(results)
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
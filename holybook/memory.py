@@ -0,0 +1,227 @@
+"""Memory cost of the documented containers and objects.
+
+For every case the object is built at several sizes and weighed three ways:
+``sys.getsizeof`` of the container alone, a deep ``getsizeof`` that follows
+contained objects (each counted once), and the bytes ``tracemalloc`` saw
+allocated while building it.  From those come the fixed cost of an instance
+(measured empty, or from one element where an empty instance has another
+layout, as for non-ASCII strings) and the marginal cost of one more element.  Instances of a plain
+class and of a ``__slots__`` class are measured the same way, ``n`` at a
+time, next to the ``array``-backed alternatives to lists of numbers.
+
+    python -m holybook.memory --markdown memory.md
+"""
+
+from __future__ import annotations
+
+import argparse
+import array
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+SIZES = (1000, 100000)
+# Element values start above the small-int cache, so every one is a new object.
+BASE = 1 << 20
+
+
+class Plain:
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class Slotted:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def _three(i, n):
+    """Three distinct ints for item ``i``, so no two fields share an object."""
+    return (BASE + i, BASE + n + i, BASE + 2 * n + i)
+
+
+def _used_vars(obj):
+    vars(obj)
+    return obj
+
+
+class Case(NamedTuple):
+    entry: str
+    label: str
+    build: Callable[[int], object]
+    # The smallest size with the case's layout, measured for the fixed cost.
+    # An empty str is always the 1-byte kind, so wider kinds start at 1.
+    base: int = 0
+
+
+class Measurement(NamedTuple):
+    entry: str
+    label: str
+    size: int
+    shallow: int
+    deep: int
+    traced: int
+
+
+CASES = (
+    Case("list", "list of int", lambda n: list(range(BASE, BASE + n))),
+    Case("list", "list of float", lambda n: [float(i) for i in range(n)]),
+    Case("list", "array('q') of int", lambda n: array.array("q", range(BASE, BASE + n))),
+    Case("list", "array('d') of float", lambda n: array.array("d", (float(i) for i in range(n)))),
+    Case("tuple", "tuple of int", lambda n: tuple(range(BASE, BASE + n))),
+    Case("set", "set of int", lambda n: set(range(BASE, BASE + n))),
+    Case("frozenset", "frozenset of int", lambda n: frozenset(range(BASE, BASE + n))),
+    Case("dict", "dict of int to int", lambda n: {i: i + n for i in range(BASE, BASE + n)}),
+    Case("range", "range", lambda n: range(n)),
+    Case("str", "str, ASCII", lambda n: "x" * n),
+    Case("str", "str, BMP (2 bytes/char)", lambda n: "€" * n, 1),
+    Case("str", "str, astral (4 bytes/char)", lambda n: "\U0001f40d" * n, 1),
+    Case("object", "instances of a plain class (3 attributes)", lambda n: [Plain(*_three(i, n)) for i in range(n)]),
+    Case("object", "instances of a __slots__ class (3 attributes)", lambda n: [Slotted(*_three(i, n)) for i in range(n)]),
+    Case("object", "tuples of 3", lambda n: [_three(i, n) for i in range(n)]),
+    Case("vars", "plain instances after vars() was called on them", lambda n: [_used_vars(Plain(*_three(i, n))) for i in range(n)]),
+)
+
+
+def deep_sizeof(obj: object) -> int:
+    """``sys.getsizeof`` of ``obj`` and of everything it holds, each once.
+
+    Follows the items of lists, tuples, sets and dicts, an instance's
+    ``__dict__`` and its ``__slots__``, but not into classes, modules or
+    functions, which are shared rather than owned.
+
+    Since Python 3.11 an instance keeps its attributes inline until its
+    ``__dict__`` is first asked for, and asking here creates it, so for plain
+    instances the ``tracemalloc`` figure is the one to trust.
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, (type, type(sys), type(deep_sizeof))):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        if hasattr(o, "__dict__"):
+            stack.append(vars(o))
+        for slot in getattr(type(o), "__slots__", ()):
+            if hasattr(o, slot):
+                stack.append(getattr(o, slot))
+    return total
+
+
+def traced_size(build: Callable[[], object]) -> int:
+    """Bytes still allocated, per ``tracemalloc``, once ``build()`` returns."""
+    gc.collect()
+    started = tracemalloc.is_tracing()
+    if not started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        obj = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        if not started:
+            tracemalloc.stop()
+    del obj
+    return after - before
+
+
+def measure(case: Case, size: int) -> Measurement:
+    obj = case.build(size)
+    return Measurement(case.entry, case.label, size, sys.getsizeof(obj), deep_sizeof(obj), traced_size(lambda: case.build(size)))
+
+
+def run(sizes: Sequence[int] = SIZES, entries: Optional[Iterable[str]] = None) -> List[Measurement]:
+    wanted = set(entries) if entries else None
+    results = []
+    for case in CASES:
+        if wanted is not None and case.entry not in wanted:
+            continue
+        for size in (case.base,) + tuple(sizes):
+            results.append(measure(case, size))
+    return results
+
+
+def render_markdown(results: Sequence[Measurement]) -> str:
+    """One table per book entry: fixed cost and per-element cost at each size.
+
+    Costs are taken relative to each case's base measurement; for a base of
+    one element the fixed cost is what remains after one element's share.
+    """
+    from holybook.book import find_entry, load_entries
+
+    entries = load_entries()
+    grouped: Dict[str, Dict[str, Dict[int, Measurement]]] = {}
+    for m in results:
+        grouped.setdefault(m.entry, {}).setdefault(m.label, {})[m.size] = m
+    bases = {case.label: case.base for case in CASES}
+    sizes = sorted({m.size for m in results if m.size != bases.get(m.label, 0)})
+
+    out = ["Measured with Python %s; bytes." % sys.version.split()[0], ""]
+    for name, cases in grouped.items():
+        entry = find_entry(entries, name)
+        out.append(entry.header if entry is not None else "**%s**" % name)
+        out.append("")
+        columns = ["fixed"] + ["per element, n=%d (deep / traced)" % s for s in sizes]
+        out.append("| | " + " | ".join(columns) + " |")
+        out.append("|---|" + "---|" * len(columns))
+        for label, by_size in cases.items():
+            base = by_size.get(bases.get(label, 0))
+            measured = [by_size[s] for s in sizes if s in by_size]
+            if base is None:
+                cells = [""]
+            elif base.size and measured:
+                last = measured[-1]
+                cells = ["%d" % round(base.deep - base.size * (last.deep - base.deep) / (last.size - base.size))]
+            else:
+                cells = [str(base.deep)]
+            for s in sizes:
+                m = by_size.get(s)
+                if m is None or base is None:
+                    cells.append("")
+                    continue
+                n = s - base.size
+                cells.append("%.1f / %.1f" % ((m.deep - base.deep) / n, (m.traced - base.traced) / n))
+            out.append("| %s | %s |" % (label, " | ".join(cells)))
+        out.append("")
+    return "\n".join(out)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.memory", description="Measure container and object memory.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--entries", nargs="+", help="only measure these entries")
+    parser.add_argument("--json", help="write the measurements as JSON")
+    parser.add_argument("--markdown", help="write the per-entry tables")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.entries)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([m._asdict() for m in results], f, indent=1)
+    report = render_markdown(results)
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(report)
+    elif not args.json:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""A parallel ``map`` that keeps the built-in's behaviour.
+
+Like ``map (function, iterable, ...)``, :func:`pmap` returns a lazy iterator,
+takes any number of iterables and stops when the shortest is exhausted.  The
+calls run on a thread or process pool instead of the calling thread:
+
+* arguments are sent in chunks whose size adapts so that each chunk takes
+  about ``target`` seconds of work, large enough to amortize the hand-off and
+  small enough to keep the workers evenly loaded;
+* at most ``max_inflight`` chunks are queued at a time, so an endless input
+  is read only as fast as results are consumed;
+* results come back in input order, or as they finish with ``ordered=False``.
+
+An exception raised by ``function`` is re-raised when its result is reached.
+With ``executor="process"`` the function and its arguments must be picklable.
+
+    python -m holybook.pmap    # benchmark against map() and a comprehension
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice, starmap
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+MAX_CHUNK = 1 << 16
+
+
+def _run_chunk(function: Callable, chunk: List[tuple]) -> Tuple[list, float, Optional[BaseException]]:
+    # Keep the results computed before a failure, as map() would have
+    # yielded them before raising.
+    started = time.perf_counter()
+    results: list = []
+    error = None
+    try:
+        results.extend(starmap(function, chunk))
+    except Exception as exc:
+        error = exc
+    return results, time.perf_counter() - started, error
+
+
+def _make_executor(executor: str, workers: Optional[int]) -> Executor:
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    if executor == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError("executor must be 'thread', 'process' or an Executor, not %r" % (executor,))
+
+
+def pmap(
+    function: Callable,
+    iterable: Iterable,
+    *iterables: Iterable,
+    executor: Union[str, Executor] = "thread",
+    workers: Optional[int] = None,
+    ordered: bool = True,
+    chunksize: Optional[int] = None,
+    target: float = 0.01,
+    max_inflight: Optional[int] = None,
+) -> Iterator[Any]:
+    """Apply ``function`` to every item of the iterables on a worker pool.
+
+    ``executor`` is ``"thread"``, ``"process"`` or an existing
+    :class:`~concurrent.futures.Executor`, which is then left running.  A fixed
+    ``chunksize`` turns the adaptive sizing off.  ``max_inflight`` defaults to
+    twice the number of workers.
+    """
+    if chunksize is not None and chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    args = zip(iterable, *iterables)
+    return _pmap(function, args, executor, workers, ordered, chunksize, target, max_inflight)
+
+
+def _pmap(function, args, executor, workers, ordered, chunksize, target, max_inflight):
+    own = not isinstance(executor, Executor)
+    pool = _make_executor(executor, workers) if own else executor
+    if max_inflight is None:
+        max_inflight = 2 * (getattr(pool, "_max_workers", None) or workers or 4)
+    size = chunksize or 1
+    pending: Deque[Future] = deque()
+    running: Set[Future] = set()
+    exhausted = False
+
+    def submit() -> bool:
+        chunk = list(islice(args, size))
+        if not chunk:
+            return False
+        future = pool.submit(_run_chunk, function, chunk)
+        if ordered:
+            pending.append(future)
+        running.add(future)
+        return True
+
+    try:
+        while True:
+            while not exhausted and len(running) < max_inflight:
+                exhausted = not submit()
+            if not running:
+                return
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                future = done.pop()
+            running.discard(future)
+            results, elapsed, error = future.result()
+            if chunksize is None:
+                # Aim the next chunks at ``target`` seconds of work each.
+                per_item = elapsed / (len(results) + (error is not None))
+                wanted = int(target / per_item) if per_item > 0 else MAX_CHUNK
+                size = max(1, min(MAX_CHUNK, wanted, 2 * size))
+            yield from results
+            if error is not None:
+                raise error
+    finally:
+        for future in running:
+            future.cancel()
+        if own:
+            pool.shutdown(wait=True)
+
+
+# Benchmark ----------------------------------------------------------------
+
+def cpu_bound(n: int) -> int:
+    total = 0
+    for i in range(200):
+        total += (n * i) % 7
+    return total
+
+
+def io_bound(n: int) -> int:
+    time.sleep(0.001)
+    return n
+
+
+def _time(run: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    run()
+    return time.perf_counter() - started
+
+
+def benchmark(items: int = 20000, io_items: int = 500, workers: Optional[int] = None) -> List[Tuple[str, str, float]]:
+    results = []
+    for kind, function, n in (("CPU-bound", cpu_bound, items), ("I/O-bound", io_bound, io_items)):
+        data = range(n)
+        cases = [
+            ("map()", lambda: list(map(function, data))),
+            ("list comprehension", lambda: [function(x) for x in data]),
+            ("pmap, threads", lambda: list(pmap(function, data, workers=workers or 8))),
+            ("pmap, threads, unordered", lambda: list(pmap(function, data, workers=workers or 8, ordered=False))),
+            ("pmap, processes", lambda: list(pmap(function, data, executor="process", workers=workers))),
+        ]
+        for label, run in cases:
+            results.append((kind, label, _time(run)))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.pmap", description="Benchmark pmap() against map().")
+    parser.add_argument("--items", type=int, default=20000, help="CPU-bound items")
+    parser.add_argument("--io-items", type=int, default=500, help="I/O-bound items (1 ms each)")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    print("| workload | implementation | seconds |")
+    print("|---|---|---|")
+    for kind, label, seconds in benchmark(args.items, args.io_items, args.workers):
+        print("| %s | %s | %.3f |" % (kind, label, seconds))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""Low-overhead profile of the built-in functions a process calls.
+
+:class:`BuiltinProfiler` hooks ``sys.setprofile`` and listens only for the
+``c_call``/``c_return`` events of functions from the ``builtins`` module,
+counting calls and cumulative time per built-in.  Profiling runs in windows
+(``window`` seconds on in every ``period``), so a process can keep it on
+without paying for it all the time.  The time the hook adds to each call is
+calibrated at start and subtracted.
+
+On Python 3.12 and later the hook is installed in every running thread, and
+removed from all of them between windows.  Before 3.12 an interpreter only
+lets a thread set its own profile function, so:
+
+* continuous profiling covers the thread that calls
+  :meth:`BuiltinProfiler.start` and the threads started after it (``start``
+  warns when other threads are already running);
+* duty-cycled profiling covers the main thread only.  It must be started
+  there; the hook removes itself when a window closes, and the controller
+  re-installs it by sending the main thread ``SIGPROF``, whose handler the
+  profiler owns while it runs.
+
+After :meth:`BuiltinProfiler.stop` each thread removes the hook at its next
+call.
+
+To attach to a running service, install a signal toggle at startup and send
+the signal when a profile is wanted::
+
+    from holybook import profiler
+    profiler.install_signal_toggle(report_path="/tmp/builtins.txt")
+    # later: kill -USR2 <pid> to start, and again to stop and write the report
+
+The report groups the hot built-ins by their section 2 entry in the book.
+"""
+
+from __future__ import annotations
+
+import builtins
+import signal
+import sys
+import threading
+import time
+import warnings
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+_perf_counter = time.perf_counter
+_BUILTIN_FUNCTIONS = {
+    id(obj): name
+    for name, obj in vars(builtins).items()
+    if type(obj).__name__ == "builtin_function_or_method"
+}
+
+
+class Stat(NamedTuple):
+    name: str
+    calls: int
+    seconds: float
+
+
+class BuiltinProfiler:
+    """Aggregate call counts and cumulative time per built-in function.
+
+    With the default ``window == period`` profiling is continuous.  Before
+    Python 3.12 a shorter ``window`` profiles only the main thread, and
+    :meth:`start` must be called there.
+    """
+
+    def __init__(self, window: float = 1.0, period: float = 1.0):
+        if not 0 < window <= period:
+            raise ValueError("window must be positive and no longer than period")
+        self.window = window
+        self.period = period
+        self.calls: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.running = False
+        self._on = False
+        self._local = threading.local()
+        # Re-entrant: a signal handler can run in the main thread while the
+        # hook there holds the lock.
+        self._lock = threading.RLock()
+        self._by_signal = False
+        self._previous_handler = None
+        self._stop = threading.Event()
+        self._controller: Optional[threading.Thread] = None
+        self._started = 0.0
+        self.profiled = 0.0
+        self.overhead: Optional[float] = None
+
+    # The hook -------------------------------------------------------------
+
+    def _hook(self, frame, event, arg):
+        if event == "c_call":
+            if not self._on:
+                # A thread can always drop its own hook.  Before 3.12 only
+                # the main thread can be given it back, by signal.
+                if _CAN_REARM or self._by_signal or not self.running:
+                    sys.setprofile(None)
+                return
+            name = _BUILTIN_FUNCTIONS.get(id(arg))
+            if name is not None:
+                stack = self._stack()
+                stack.append((name, _perf_counter()))
+        elif event == "c_return" or event == "c_exception":
+            name = _BUILTIN_FUNCTIONS.get(id(arg))
+            if name is not None:
+                stack = self._stack()
+                if stack and stack[-1][0] == name:
+                    _, started = stack.pop()
+                    elapsed = _perf_counter() - started
+                    with self._lock:
+                        self.calls[name] = self.calls.get(name, 0) + 1
+                        self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+
+    def _stack(self) -> List[Tuple[str, float]]:
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    # Control ----------------------------------------------------------------
+
+    def calibrate(self, calls: int = 1000, rounds: int = 5) -> float:
+        """Measure the time the hook itself adds to each timed call.
+
+        ``len(())`` costs a few nanoseconds, so nearly all of the time
+        recorded for it is the hook's own.  The quickest of ``rounds``
+        batches is kept.
+        """
+        best = float("inf")
+        previous = sys.getprofile()
+        for _ in range(rounds):
+            probe = BuiltinProfiler()
+            probe._on = True
+            sys.setprofile(probe._hook)
+            try:
+                for _ in range(calls):
+                    len(())
+            finally:
+                sys.setprofile(previous)
+            best = min(best, probe.seconds.get("len", 0.0) / max(1, probe.calls.get("len", 1)))
+        return best
+
+    def start(self) -> "BuiltinProfiler":
+        if self.running:
+            return self
+        if self.overhead is None:
+            self.overhead = self.calibrate()
+        if not _CAN_REARM and self.window < self.period:
+            if _REARM_SIGNAL is None or threading.current_thread() is not threading.main_thread():
+                raise RuntimeError("before Python 3.12, duty-cycled profiling must start in the main thread, with SIGPROF")
+            self._by_signal = True
+            self._previous_handler = signal.signal(_REARM_SIGNAL, self._rearm)
+            if threading.active_count() > 1:
+                warnings.warn(
+                    "before Python 3.12 duty-cycled profiling covers only the main thread; "
+                    "%d other thread(s) are not profiled" % (threading.active_count() - 1),
+                    RuntimeWarning,
+                    stacklevel=2,
+                )
+        elif not _CAN_REARM and threading.active_count() > 1:
+            warnings.warn(
+                "before Python 3.12 only the calling thread and threads started from now on are profiled; "
+                "%d other thread(s) already running are not" % (threading.active_count() - 1),
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        self.running = True
+        self._stop.clear()
+        self._switch(True)
+        if self.window < self.period:
+            self._controller = threading.Thread(target=self._cycle, name="holybook-profiler", daemon=True)
+            self._controller.start()
+        return self
+
+    def stop(self) -> "BuiltinProfiler":
+        if not self.running:
+            return self
+        self.running = False
+        self._stop.set()
+        if self._controller is not None:
+            self._controller.join()
+            self._controller = None
+        self._switch(False)
+        _set_profile(None)
+        if self._by_signal:
+            # Outside the main thread the handler stays, but finds _on False.
+            if threading.current_thread() is threading.main_thread():
+                signal.signal(_REARM_SIGNAL, self._previous_handler)
+            self._by_signal = False
+        return self
+
+    def __enter__(self) -> "BuiltinProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _switch(self, on: bool) -> None:
+        now = _perf_counter()
+        if on and not self._on:
+            self._started = now
+            self._on = True
+            if not self._by_signal:
+                _set_profile(self._hook)
+            elif threading.current_thread() is threading.main_thread():
+                sys.setprofile(self._hook)
+            else:
+                signal.pthread_kill(threading.main_thread().ident, _REARM_SIGNAL)
+        elif not on and self._on:
+            self._on = False
+            self.profiled += now - self._started
+
+    def _rearm(self, signum, frame) -> None:
+        if self._on:
+            sys.setprofile(self._hook)
+
+    def _cycle(self) -> None:
+        while not self._stop.wait(self.window):
+            self._switch(False)
+            if self._stop.wait(self.period - self.window):
+                break
+            self._switch(True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.seconds.clear()
+        self.profiled = 0.0
+
+    # Results ----------------------------------------------------------------
+
+    def stats(self) -> List[Stat]:
+        """Per-built-in totals, slowest first, less the hook's own overhead."""
+        overhead = self.overhead or 0.0
+        with self._lock:
+            stats = [
+                Stat(name, calls, max(0.0, self.seconds[name] - overhead * calls))
+                for name, calls in self.calls.items()
+            ]
+        return sorted(stats, key=lambda s: (-s.seconds, s.name))
+
+    def report(self, limit: int = 20) -> str:
+        """Render the hot built-ins grouped by their book entry."""
+        from holybook import BOOK_PY
+        from holybook.book import find_entry, load_entries
+
+        entries = load_entries()
+        profiled = self.profiled + (_perf_counter() - self._started if self._on else 0.0)
+        lines = [
+            "Built-in calls over %.2f s profiled (%s)" % (profiled, "continuous" if self.window == self.period
+                                                          else "%.0f%% duty cycle" % (100 * self.window / self.period)),
+            "",
+            "%-12s %10s %12s %10s %7s  %s" % ("builtin", "calls", "total", "per call", "share", "book"),
+        ]
+        stats = self.stats()[:limit]
+        for stat in stats:
+            entry = find_entry(entries, stat.name)
+            where = "§%s %s:%d" % (entry.section, BOOK_PY.name, entry.lineno) if entry is not None and entry.lineno else "-"
+            lines.append("%-12s %10d %10.3f ms %8.0f ns %6.1f%%  %s" % (
+                stat.name, stat.calls, stat.seconds * 1e3, stat.seconds / stat.calls * 1e9,
+                100 * stat.seconds / profiled if profiled else 0.0, where,
+            ))
+        if not stats:
+            lines.append("(no built-in calls seen)")
+        return "\n".join(lines)
+
+
+_CAN_REARM = hasattr(threading, "setprofile_all_threads")
+_REARM_SIGNAL = getattr(signal, "SIGPROF", None) if hasattr(signal, "pthread_kill") else None
+
+
+def _set_profile(hook) -> None:
+    """Install ``hook`` in every thread where the interpreter allows it.
+
+    Before 3.12 a profile function can only be set for the calling thread
+    and for threads started afterwards.
+    """
+    if _CAN_REARM:
+        threading.setprofile_all_threads(hook)
+    else:
+        threading.setprofile(hook)
+        sys.setprofile(hook)
+
+
+def install_signal_toggle(
+    signum: Optional[int] = None,
+    report_path: Optional[str] = None,
+    window: float = 1.0,
+    period: float = 1.0,
+) -> BuiltinProfiler:
+    """Start/stop a profiler each time the process receives ``signum``.
+
+    ``signum`` defaults to ``SIGUSR2``; platforms without it must name a
+    signal.  Stopping writes the report to ``report_path`` (or stderr) and
+    resets the counters; the handler only starts or stops the profiler, and
+    the report is built on a separate thread.  Must be called from the main
+    thread, which before Python 3.12 is also the only already-running thread
+    profiled.
+    """
+    if signum is None:
+        signum = getattr(signal, "SIGUSR2", None)
+        if signum is None:
+            raise ValueError("this platform has no SIGUSR2; pass the signal to toggle on")
+    profiler = BuiltinProfiler(window, period)
+
+    def toggle(signum, frame):
+        if not profiler.running:
+            profiler.start()
+            return
+        profiler.stop()
+        threading.Thread(target=write_report, name="holybook-profiler-report").start()
+
+    def write_report():
+        text = profiler.report() + "\n"
+        if report_path:
+            with open(report_path, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stderr.write(text)
+        profiler.reset()
+
+    signal.signal(signum, toggle)
+    return profiler
@@ -0,0 +1,445 @@
+"""Track the built-in benchmarks across every local Python interpreter.
+
+``run`` finds the interpreters installed on this machine (on ``PATH``, under
+pyenv, in the usual system directories), runs the ``holybook.bench``
+workloads under each in a fresh subprocess, and appends the results to a
+SQLite history in ``.holybook/``.  ``report`` compares each version with a
+baseline, by default the 3.9 the book is written for.  Every run of every
+interpreter is one sample, and a change is flagged when a two-sided
+Mann-Whitney U test finds it significant and it is larger than a minimum
+effect size.
+
+    python -m holybook.regress run --runs 5
+    python -m holybook.regress report --baseline 3.9
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import functools
+import glob
+import json
+import math
+import os
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from holybook import CACHE_DIR, ROOT
+from holybook.bench import KINDS
+
+DEFAULT_DB = CACHE_DIR / "history.sqlite"
+
+# holybook.bench uses dataclasses and postponed annotations.
+MIN_VERSION = (3, 7)
+
+_NAME = re.compile(r"^(python|pypy)(\d(\.\d+)?)?$")
+
+_PROBE = (
+    "import json, platform, sys; "
+    "print(json.dumps([platform.python_implementation(), platform.python_version(), sys.executable, list(sys.version_info[:2])]))"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    implementation TEXT NOT NULL,
+    version TEXT NOT NULL,
+    executable TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    machine TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run INTEGER NOT NULL REFERENCES runs(id),
+    entry TEXT NOT NULL,
+    label TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    best REAL NOT NULL,
+    median REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_run ON results(run);
+"""
+
+
+class Interpreter(NamedTuple):
+    executable: str
+    implementation: str
+    version: str
+
+    @property
+    def name(self) -> str:
+        return "%s %s" % (self.implementation, self.version)
+
+
+class Comparison(NamedTuple):
+    entry: str
+    label: str
+    kind: str
+    size: int
+    version: str
+    baseline: float
+    median: float
+    p: float
+    verdict: str
+
+    @property
+    def ratio(self) -> float:
+        return self.median / self.baseline
+
+
+# Discovery ----------------------------------------------------------------
+
+def candidates() -> List[str]:
+    """Paths that may be Python interpreters, in ``PATH`` order first."""
+    dirs = os.environ.get("PATH", "").split(os.pathsep)
+    pyenv = os.environ.get("PYENV_ROOT") or os.path.expanduser("~/.pyenv")
+    dirs += sorted(glob.glob(os.path.join(pyenv, "versions", "*", "bin")))
+    dirs += ["/usr/local/bin", "/usr/bin", "/opt/homebrew/bin"]
+    found = []
+    for directory in dirs:
+        # pyenv shims re-dispatch to the versions found directly below.
+        if not directory or os.path.basename(directory) == "shims":
+            continue
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(directory, name)
+            if _NAME.match(name) and os.access(path, os.X_OK) and not os.path.isdir(path):
+                found.append(path)
+    return found
+
+
+def probe(executable: str) -> Optional[Tuple[Interpreter, Tuple[int, int]]]:
+    try:
+        done = subprocess.run(
+            [executable, "-E", "-s", "-c", _PROBE],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if done.returncode:
+        return None
+    try:
+        implementation, version, path, info = json.loads(done.stdout)
+    except ValueError:
+        return None
+    return Interpreter(path or executable, implementation, version), tuple(info)
+
+
+def discover(paths: Optional[Iterable[str]] = None) -> List[Interpreter]:
+    """One interpreter per implementation and version that can run the bench."""
+    seen_paths = set()
+    seen = set()
+    found = []
+    for path in candidates() if paths is None else paths:
+        real = os.path.realpath(path)
+        if real in seen_paths:
+            continue
+        seen_paths.add(real)
+        probed = probe(path)
+        if probed is None or probed[1] < MIN_VERSION:
+            continue
+        interpreter = probed[0]
+        if (interpreter.implementation, interpreter.version) in seen:
+            continue
+        seen.add((interpreter.implementation, interpreter.version))
+        found.append(interpreter)
+    return sorted(found, key=lambda i: (i.implementation, _version_key(i.version)))
+
+
+def _version_key(version: str) -> tuple:
+    return tuple(int(part) if part.isdigit() else 0 for part in re.split(r"[.+]", version))
+
+
+# Running ------------------------------------------------------------------
+
+def run_bench(interpreter: Interpreter, bench_args: Sequence[str]) -> dict:
+    """Run ``holybook.bench`` under ``interpreter`` and return its JSON document.
+
+    ``-E -s`` keeps the ``PYTHON*`` variables and user site-packages out, so
+    every interpreter runs the workloads from this checkout and nothing else.
+    """
+    fd, path = tempfile.mkstemp(prefix="holybook-bench-", suffix=".json")
+    os.close(fd)
+    try:
+        done = subprocess.run(
+            [interpreter.executable, "-E", "-s", "-m", "holybook.bench", "--json", path, "-q"] + list(bench_args),
+            cwd=str(ROOT), stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+        )
+        if done.returncode:
+            raise RuntimeError("%s failed:\n%s" % (interpreter.name, done.stderr[-2000:]))
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.unlink(path)
+
+
+def connect(path: Path = DEFAULT_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(path))
+    db.executescript(_SCHEMA)
+    return db
+
+
+def store(db: sqlite3.Connection, interpreter: Interpreter, document: dict) -> int:
+    meta = document["meta"]
+    with db:
+        cursor = db.execute(
+            "INSERT INTO runs (timestamp, implementation, version, executable, platform, machine) VALUES (?, ?, ?, ?, ?, ?)",
+            (meta["timestamp"], interpreter.implementation, interpreter.version, interpreter.executable, meta["platform"], meta["machine"]),
+        )
+        run = cursor.lastrowid
+        db.executemany(
+            "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(run, r["entry"], r["label"], r["kind"], r["size"], r["number"], r["best"], r["median"]) for r in document["results"]],
+        )
+    return run
+
+
+def record(
+    db: sqlite3.Connection,
+    interpreters: Sequence[Interpreter],
+    bench_args: Sequence[str],
+    runs: int = 5,
+    progress=None,
+) -> List[str]:
+    """Benchmark every interpreter ``runs`` times and return the failures.
+
+    The interpreters take turns, so a slow spell on the machine is spread
+    over all of them instead of skewing one version.
+    """
+    failed = []
+    for i in range(runs):
+        for interpreter in interpreters:
+            if interpreter.name in failed:
+                continue
+            if progress is not None:
+                progress("run %d/%d: %s (%s)" % (i + 1, runs, interpreter.name, interpreter.executable))
+            try:
+                store(db, interpreter, run_bench(interpreter, bench_args))
+            except RuntimeError as e:
+                failed.append(interpreter.name)
+                print(e, file=sys.stderr)
+    return failed
+
+
+# Statistics ---------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def _u_counts(m: int, n: int) -> Tuple[int, ...]:
+    """How many orderings of ``m`` and ``n`` distinct values give each U."""
+    if m == 0 or n == 0:
+        return (1,)
+    shifted = _u_counts(m - 1, n)
+    rest = _u_counts(m, n - 1)
+    counts = [0] * (m * n + 1)
+    for u, c in enumerate(shifted):
+        counts[u + n] += c
+    for u, c in enumerate(rest):
+        counts[u] += c
+    return tuple(counts)
+
+
+def mann_whitney(a: Sequence[float], b: Sequence[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test.
+
+    Exact for small samples without ties, otherwise the normal
+    approximation with tie and continuity corrections.
+    """
+    m, n = len(a), len(b)
+    if not m or not n:
+        return 1.0
+    pooled = sorted([(x, 0) for x in a] + [(y, 1) for y in b])
+    ranks = [0.0] * len(pooled)
+    ties = []
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        if j > i:
+            ties.append(j - i + 1)
+        i = j + 1
+    u = sum(r for r, (_, side) in zip(ranks, pooled) if side == 0) - m * (m + 1) / 2
+    if not ties and m * n <= 400:
+        counts = _u_counts(m, n)
+        total = sum(counts)
+        low = sum(counts[: int(u) + 1]) / total
+        high = sum(counts[int(u):]) / total
+        return min(1.0, 2 * min(low, high))
+    total = m + n
+    variance = m * n / 12 * ((total + 1) - sum(t ** 3 - t for t in ties) / (total * (total - 1)))
+    if variance <= 0:
+        return 1.0
+    z = max(abs(u - m * n / 2) - 0.5, 0.0) / math.sqrt(variance)
+    return math.erfc(z / math.sqrt(2))
+
+
+# Reporting ----------------------------------------------------------------
+
+def load_samples(db: sqlite3.Connection, window: int = 10) -> Dict[str, Dict[tuple, List[float]]]:
+    """Best times per version and measurement, from each version's latest runs."""
+    samples: Dict[str, Dict[tuple, List[float]]] = {}
+    versions = db.execute("SELECT DISTINCT implementation, version FROM runs").fetchall()
+    for implementation, version in versions:
+        runs = [row[0] for row in db.execute(
+            "SELECT id FROM runs WHERE implementation = ? AND version = ? ORDER BY id DESC LIMIT ?",
+            (implementation, version, window),
+        )]
+        by_key = samples.setdefault("%s %s" % (implementation, version), {})
+        query = "SELECT entry, label, kind, size, best FROM results WHERE run IN (%s)" % ", ".join("?" * len(runs))
+        for entry, label, kind, size, best in db.execute(query, runs):
+            by_key.setdefault((entry, label, kind, size), []).append(best)
+    return samples
+
+
+def pick_baseline(versions: Iterable[str], wanted: str) -> Optional[str]:
+    """The newest version matching ``wanted`` (such as ``3.9``), else the oldest."""
+    ordered = sorted(versions, key=lambda v: _version_key(v.split()[-1]))
+    matching = [v for v in ordered if v == wanted or (v.split()[-1] + ".").startswith(wanted + ".")]
+    if matching:
+        return matching[-1]
+    return ordered[0] if ordered else None
+
+
+def compare(
+    samples: Dict[str, Dict[tuple, List[float]]],
+    baseline: str,
+    alpha: float = 0.01,
+    threshold: float = 0.05,
+) -> List[Comparison]:
+    """Compare every version with ``baseline`` on every shared measurement.
+
+    A change is ``"faster"`` or ``"slower"`` when its p-value is below
+    ``alpha`` and the medians differ by more than ``threshold``.
+    """
+    base = samples[baseline]
+    rows = []
+    for version in sorted(samples, key=lambda v: _version_key(v.split()[-1])):
+        if version == baseline:
+            continue
+        for key, times in sorted(samples[version].items()):
+            if key not in base:
+                continue
+            before, after = statistics.median(base[key]), statistics.median(times)
+            p = mann_whitney(base[key], times)
+            verdict = ""
+            if p < alpha and abs(after / before - 1) > threshold:
+                verdict = "slower" if after > before else "faster"
+            rows.append(Comparison(key[0], key[1], key[2], key[3], version, before, after, p, verdict))
+    return rows
+
+
+def render_report(rows: Sequence[Comparison], baseline: str, show_all: bool = False) -> str:
+    """A per-entry summary across versions, then the individual changes."""
+    from holybook.bench import _book_order, format_time
+    from holybook.book import load_entries
+
+    entries = load_entries()
+    versions = sorted({r.version for r in rows}, key=lambda v: _version_key(v.split()[-1]))
+    names = sorted({r.entry for r in rows}, key=lambda n: _book_order(entries, n))
+    out = ["Compared with %s. Each cell is the geometric mean time ratio, then the significant changes.\n" % baseline]
+    out.append("| entry | " + " | ".join(versions) + " |")
+    out.append("|---|" + "---|" * len(versions))
+    for name in names:
+        cells = []
+        for version in versions:
+            mine = [r for r in rows if r.entry == name and r.version == version]
+            if not mine:
+                cells.append("")
+                continue
+            mean = math.exp(statistics.mean(math.log(r.ratio) for r in mine))
+            faster = sum(r.verdict == "faster" for r in mine)
+            slower = sum(r.verdict == "slower" for r in mine)
+            cells.append("%.2fx, %d faster, %d slower" % (mean, faster, slower))
+        out.append("| %s | %s |" % (name, " | ".join(cells)))
+    out.append("")
+    shown = [r for r in rows if show_all or r.verdict]
+    if shown:
+        out.append("| version | entry | expression | input | n | %s | time | change | p | |" % baseline)
+        out.append("|---|---|---|---|---|---|---|---|---|---|")
+        for r in shown:
+            out.append("| %s | %s | `%s` | %s | %d | %s | %s | %+.1f%% | %.3g | %s |" % (
+                r.version, r.entry, r.label, r.kind, r.size, format_time(r.baseline), format_time(r.median),
+                (r.ratio - 1) * 100, r.p, r.verdict,
+            ))
+        out.append("")
+    return "\n".join(out)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.regress", description="Track the built-in benchmarks across interpreters.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    listing = commands.add_parser("list", help="show the interpreters that would be benchmarked")
+    listing.add_argument("--python", nargs="+", help="interpreters to use instead of the discovered ones")
+
+    run = commands.add_parser("run", help="benchmark every interpreter and store the results")
+    run.add_argument("--python", nargs="+", help="interpreters to use instead of the discovered ones")
+    run.add_argument("--runs", type=int, default=5, help="runs per interpreter; 5 or more for p < 0.01")
+    run.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    run.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    run.add_argument("--entries", nargs="+", help="only benchmark these entries")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--min-time", type=float, default=0.05, help="seconds per timing loop")
+
+    report = commands.add_parser("report", help="compare the stored results with a baseline version")
+    report.add_argument("--baseline", default="3.9", help="version to compare with (default: the newest 3.9)")
+    report.add_argument("--window", type=int, default=10, help="latest runs per version to use")
+    report.add_argument("--alpha", type=float, default=0.01, help="significance level")
+    report.add_argument("--threshold", type=float, default=0.05, help="smallest relative change to flag")
+    report.add_argument("--all", action="store_true", help="list unchanged measurements too")
+    args = parser.parse_args(argv)
+
+    if args.command in ("list", "run"):
+        interpreters = discover(args.python)
+        if not interpreters:
+            print("no Python %d.%d+ interpreter found" % MIN_VERSION, file=sys.stderr)
+            return 1
+        if args.command == "list":
+            for interpreter in interpreters:
+                print("%-16s %s" % (interpreter.name, interpreter.executable))
+            return 0
+        bench_args = ["--sizes"] + [str(s) for s in args.sizes] + ["--kinds"] + args.kinds
+        bench_args += ["--repeat", str(args.repeat), "--min-time", str(args.min_time)]
+        if args.entries:
+            bench_args += ["--entries"] + args.entries
+        started = datetime.datetime.now()
+        with contextlib.closing(connect(args.db)) as db:
+            failed = record(db, interpreters, bench_args, args.runs, lambda line: print(line, file=sys.stderr))
+        print("stored %d run(s) of %d interpreter(s) in %s (%s)" % (
+            args.runs, len(interpreters) - len(failed), args.db, str(datetime.datetime.now() - started).split(".")[0],
+        ), file=sys.stderr)
+        return 1 if failed else 0
+
+    if not args.db.exists():
+        print("no history in %s; record some with `python -m holybook.regress run`" % args.db, file=sys.stderr)
+        return 1
+    with contextlib.closing(connect(args.db)) as db:
+        samples = load_samples(db, args.window)
+    baseline = pick_baseline(samples, args.baseline)
+    if baseline is None or len(samples) < 2:
+        print("need results from at least two versions", file=sys.stderr)
+        return 1
+    print(render_report(compare(samples, baseline, args.alpha, args.threshold), baseline, args.all))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
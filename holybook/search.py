@@ -0,0 +1,225 @@
+"""Ranked full-text search over the entry bodies.
+
+Entries are scored with BM25 against a persistent inverted index.  The index
+is stored per cell, keyed by a hash of the cell's source and section, so that
+:meth:`SearchIndex.update` re-tokenizes only the cells that changed since the
+last run.  Cross-references between entries ("see setattr()", "a relative of
+getattr()") are kept as weighted links, and part of an entry's score flows
+along them to the entries it points at.
+
+    python -m holybook.search "private name mangling"
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from holybook import CACHE_DIR
+from holybook.book import Cell, Entry, heading_section, parse_entries, read_cells, unescape
+
+VERSION = 2
+DEFAULT_INDEX = CACHE_DIR / "search.json"
+
+K1 = 1.2
+B = 0.75
+# Occurrences credited to every word of an entry's own name.
+NAME_BOOST = 3
+# Share of a linking entry's score passed on to the entry it links to.
+LINK_DAMPING = 0.3
+# An explicit "see x()" is a stronger pointer than a passing mention of x().
+SEE_WEIGHT = 1.0
+MENTION_WEIGHT = 0.5
+
+_WORD = re.compile(r"[a-z_][a-z0-9_]*|\d+")
+_SEE = re.compile(r"\bsee(?:\s+also)?\s+(?:\*\*)?(@?[\w.]+)\s*\(\)", re.IGNORECASE)
+_MENTION = re.compile(r"(?<![\w.])(@?[A-Za-z_][\w.]*)\s?\(\)")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from if in is it its of on or that the this to was which with".split()
+)
+
+
+class Hit(NamedTuple):
+    name: str
+    section: str
+    score: float
+    links: Tuple[str, ...]
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD.findall(unescape(text).lower()) if w not in _STOPWORDS]
+
+
+def cross_references(entry: Entry) -> Dict[str, float]:
+    """Map every name ``entry`` refers to onto the weight of the reference."""
+    body = unescape(entry.body)
+    links: Dict[str, float] = {}
+    for name in _MENTION.findall(body):
+        links[name.lstrip("@")] = MENTION_WEIGHT
+    for name in _SEE.findall(body):
+        links[name.lstrip("@")] = SEE_WEIGHT
+    for name in entry.names:
+        links.pop(name.lstrip("@"), None)
+    return links
+
+
+def cell_key(cell: Cell, section: str) -> str:
+    digest = hashlib.sha1(section.encode("utf-8") + b"\0" + cell.source.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def index_cell(cell: Cell, section: str) -> dict:
+    """Build the stored record for one cell: its entries and their postings."""
+    entries = []
+    postings: Dict[str, List[List[int]]] = {}
+    for number, entry in enumerate(parse_entries([cell], section)):
+        terms = Counter(tokenize(entry.body))
+        for name in entry.names:
+            for word in tokenize(name):
+                terms[word] += NAME_BOOST
+        entries.append({
+            "name": entry.name,
+            "aliases": list(entry.aliases),
+            "section": entry.section,
+            "length": sum(terms.values()),
+            "links": cross_references(entry),
+        })
+        for term, tf in terms.items():
+            postings.setdefault(term, []).append([number, tf])
+    return {"entries": entries, "postings": postings}
+
+
+class SearchIndex:
+    """BM25 search over the cells recorded in a JSON index file."""
+
+    def __init__(self, path: Path = DEFAULT_INDEX):
+        self.path = Path(path)
+        self.cells: Dict[str, dict] = {}
+        self.order: List[str] = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = None
+        if stored and stored.get("version") == VERSION:
+            self.cells = stored["cells"]
+            self.order = stored["order"]
+        self._merge()
+
+    def update(self, cells: Iterable[Cell]) -> int:
+        """Bring the index in line with ``cells``; return how many were re-indexed."""
+        section = ""
+        order = []
+        fresh = {}
+        reindexed = 0
+        for cell in cells:
+            heading = heading_section(cell)
+            if heading is not None:
+                section = heading
+            if cell.cell_type != "markdown" or heading is not None:
+                continue
+            key = cell_key(cell, section)
+            order.append(key)
+            if key in self.cells:
+                fresh[key] = self.cells[key]
+            else:
+                fresh[key] = index_cell(cell, section)
+                reindexed += 1
+        changed = reindexed or order != self.order
+        self.cells, self.order = fresh, order
+        if changed:
+            self._merge()
+            self.save()
+        return reindexed
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "order": self.order, "cells": self.cells}, f)
+        os.replace(tmp, self.path)
+
+    def _merge(self) -> None:
+        """Combine the per-cell postings into one inverted index."""
+        self.docs: List[dict] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for key in self.order:
+            record = self.cells[key]
+            base = len(self.docs)
+            self.docs.extend(record["entries"])
+            for term, pairs in record["postings"].items():
+                self.postings.setdefault(term, []).extend((base + number, tf) for number, tf in pairs)
+        self.by_name = {}
+        for number, doc in enumerate(self.docs):
+            for name in [doc["name"]] + doc["aliases"]:
+                self.by_name.setdefault(name.lstrip("@"), number)
+        lengths = [doc["length"] for doc in self.docs]
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    def bm25(self, terms: Sequence[str]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        count = len(self.docs)
+        for term in set(terms):
+            pairs = self.postings.get(term, ())
+            if not pairs:
+                continue
+            idf = math.log(1 + (count - len(pairs) + 0.5) / (len(pairs) + 0.5))
+            for number, tf in pairs:
+                norm = K1 * (1 - B + B * self.docs[number]["length"] / self.average_length)
+                scores[number] = scores.get(number, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> List[Hit]:
+        base = self.bm25(tokenize(query))
+        scores = dict(base)
+        for number, score in base.items():
+            for name, weight in self.docs[number]["links"].items():
+                target = self.by_name.get(name)
+                if target is not None:
+                    scores[target] = scores.get(target, 0.0) + LINK_DAMPING * weight * score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [
+            Hit(self.docs[n]["name"], self.docs[n]["section"], score, tuple(self.docs[n]["links"]))
+            for n, score in ranked
+        ]
+
+
+def open_index(path: Path = DEFAULT_INDEX, source: Optional[Path] = None) -> SearchIndex:
+    """Load the index at ``path`` and re-index whatever changed in ``source``."""
+    index = SearchIndex(path)
+    index.update(read_cells(source))
+    return index
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.search", description="Search the book's entries.")
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("-n", "--limit", type=int, default=10)
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX)
+    parser.add_argument("--source", type=Path, help="the .py export (default) or the .ipynb")
+    parser.add_argument("--rebuild", action="store_true", help="discard the stored index first")
+    args = parser.parse_args(argv)
+
+    if args.rebuild and args.index.exists():
+        args.index.unlink()
+    index = open_index(args.index, args.source)
+    hits = index.search(" ".join(args.query), args.limit)
+    if not hits:
+        print("no match", file=sys.stderr)
+        return 1
+    for hit in hits:
+        see = "  (see %s)" % ", ".join(hit.links) if hit.links else ""
+        print("%7.3f  %-16s  §%s%s" % (hit.score, hit.name, hit.section, see))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
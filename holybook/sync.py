@@ -0,0 +1,241 @@
+"""Keep the notebook and its ``.py`` export in step.
+
+Both documents are split into cells with their exact extent in the file: line
+ranges in the export, character spans of each cell object in the notebook
+JSON.  Cells are matched by a hash of their type and source, and only the
+cells that differ are re-rendered; every other region is copied through
+byte for byte, so a one-cell edit produces a one-cell diff.
+
+Each document is read whole rather than streamed: the book is tens of
+kilobytes, and holding its text lets regions be copied by slicing.  Every
+notebook cell is decoded, one at a time from its own span, to learn its
+source; only the cells that changed are re-rendered.
+
+    python -m holybook.sync --check
+    python -m holybook.sync --to py
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from holybook import BOOK_IPYNB, BOOK_PY
+from holybook.book import split_py_cells
+
+PY_HEADER = "#!/usr/bin/env python\n# coding: utf-8\n"
+_CELLS = re.compile(r'"cells":\s*\[')
+_CELL_INDENT = "  "
+
+
+class Region(NamedTuple):
+    """A cell and the text it occupies in one of the two documents."""
+
+    cell_type: str
+    source: str
+    text: str
+
+    @property
+    def key(self) -> str:
+        return cell_hash(self.cell_type, self.source)
+
+
+class Document(NamedTuple):
+    prefix: str
+    regions: List[Region]
+    suffix: str
+    separator: str
+
+
+def cell_hash(cell_type: str, source: str) -> str:
+    return hashlib.sha1((cell_type + "\0" + source).encode("utf-8")).hexdigest()
+
+
+# The .py export ------------------------------------------------------------
+
+def render_py_cell(cell_type: str, source: str, execution_count: Optional[int] = None) -> str:
+    """Render one cell the way nbconvert's python exporter does."""
+    if cell_type == "code":
+        count = " " if execution_count is None else str(execution_count)
+        return "\n# In[%s]:\n\n\n%s\n\n" % (count, source)
+    return "\n" + "".join("# %s\n" % line for line in source.split("\n"))
+
+
+def read_py(path: Path) -> Document:
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    lines = text.split("\n")
+    cells = split_py_cells(lines)
+    # Each region runs from the blank line in front of its cell to the blank
+    # line in front of the next one.
+    starts = [c.offset - (4 if c.cell_type == "code" else 1) for c in cells]
+    bounds = [_line_offsets(lines, s) for s in starts] + [len(text)]
+    regions = [
+        Region(cell.cell_type, cell.source, text[bounds[i]:bounds[i + 1]])
+        for i, cell in enumerate(cells)
+    ]
+    return Document(text[:bounds[0]] if cells else text, regions, "", "")
+
+
+def _line_offsets(lines: Sequence[str], line: int) -> int:
+    return sum(len(l) + 1 for l in lines[:line])
+
+
+# The notebook -------------------------------------------------------------
+
+def read_ipynb(path: Path) -> Tuple[Document, List[dict]]:
+    """Split the notebook into the JSON text of each cell and the text around them.
+
+    The text is read whole and every cell is decoded, one at a time from its
+    offset, which also gives the span of text it occupies.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    match = _CELLS.search(text)
+    if match is None:
+        raise ValueError("%s has no cells array" % path)
+    decoder = json.JSONDecoder()
+    regions = []
+    cells = []
+    position = match.end()
+    prefix_end = None
+    end = position
+    while True:
+        while text[position] in " \t\r\n,":
+            position += 1
+        if text[position] == "]":
+            break
+        if prefix_end is None:
+            prefix_end = position
+        cell, end = decoder.raw_decode(text, position)
+        cells.append(cell)
+        regions.append(Region(cell["cell_type"], "".join(cell["source"]), text[position:end]))
+        position = end
+    if prefix_end is None:
+        prefix_end = end = match.end()
+    separator = ",\n" + _CELL_INDENT
+    return Document(text[:prefix_end], regions, text[end:], separator), cells
+
+
+def render_ipynb_cell(cell: dict) -> str:
+    """Serialize a cell the way Jupyter writes it (indent 1, sorted keys)."""
+    text = json.dumps(cell, indent=1, sort_keys=True, ensure_ascii=False)
+    return text.replace("\n", "\n" + _CELL_INDENT)
+
+
+def source_lines(source: str) -> List[str]:
+    lines = [line + "\n" for line in source.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    return [line for line in lines if line]
+
+
+def new_cell(cell_type: str, source: str, template: Optional[dict] = None) -> dict:
+    """Build a notebook cell, keeping ``template``'s metadata where it fits."""
+    cell = dict(template or {})
+    cell.setdefault("metadata", {})
+    cell["cell_type"] = cell_type
+    cell["source"] = source_lines(source)
+    if cell_type == "code":
+        cell.setdefault("execution_count", None)
+        cell.setdefault("outputs", [])
+    else:
+        cell.pop("execution_count", None)
+        cell.pop("outputs", None)
+    return cell
+
+
+# Synchronization ----------------------------------------------------------
+
+def diff(a: Sequence[Region], b: Sequence[Region]) -> List[tuple]:
+    matcher = difflib.SequenceMatcher(None, [r.key for r in a], [r.key for r in b], autojunk=False)
+    return matcher.get_opcodes()
+
+
+def sync_to_py(py: Path = BOOK_PY, ipynb: Path = BOOK_IPYNB, write: bool = True) -> int:
+    """Rewrite the cells of the export that differ from the notebook.
+
+    Returns the number of cells rewritten (or that would be, if not ``write``).
+    """
+    notebook, nb_cells = read_ipynb(ipynb)
+    if py.exists():
+        export = read_py(py)
+    else:
+        export = Document(PY_HEADER, [], "", "")
+    out = [export.prefix]
+    changed = 0
+    for tag, i1, i2, j1, j2 in diff(export.regions, notebook.regions):
+        if tag == "equal":
+            out.extend(r.text for r in export.regions[i1:i2])
+            continue
+        changed += max(i2 - i1, j2 - j1)
+        for cell in nb_cells[j1:j2]:
+            out.append(render_py_cell(cell["cell_type"], "".join(cell["source"]), cell.get("execution_count")))
+    if changed and write:
+        _replace(py, "".join(out))
+    return changed
+
+
+def sync_to_ipynb(ipynb: Path = BOOK_IPYNB, py: Path = BOOK_PY, write: bool = True) -> int:
+    """Rewrite the notebook cells that differ from the export.
+
+    A cell edited in place keeps its metadata and, for code cells, its
+    outputs.  Returns the number of cells rewritten.
+    """
+    notebook, nb_cells = read_ipynb(ipynb)
+    export = read_py(py)
+    texts = []
+    changed = 0
+    for tag, i1, i2, j1, j2 in diff(notebook.regions, export.regions):
+        if tag == "equal":
+            texts.extend(r.text for r in notebook.regions[i1:i2])
+            continue
+        changed += max(i2 - i1, j2 - j1)
+        templates = nb_cells[i1:i2]
+        for k, region in enumerate(export.regions[j1:j2]):
+            template = templates[k] if k < len(templates) else None
+            texts.append(render_ipynb_cell(new_cell(region.cell_type, region.source, template)))
+    if changed and write:
+        _replace(ipynb, notebook.prefix + notebook.separator.join(texts) + notebook.suffix)
+    return changed
+
+
+def _replace(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.sync", description="Sync the notebook and its .py export.")
+    parser.add_argument("--py", type=Path, default=BOOK_PY)
+    parser.add_argument("--ipynb", type=Path, default=BOOK_IPYNB)
+    parser.add_argument("--to", choices=("py", "ipynb"), help="document to update (default: the older one)")
+    parser.add_argument("--check", action="store_true", help="only report whether the two differ")
+    args = parser.parse_args(argv)
+
+    target = args.to
+    if target is None:
+        newer_py = args.py.exists() and args.py.stat().st_mtime > args.ipynb.stat().st_mtime
+        target = "ipynb" if newer_py else "py"
+    if target == "py":
+        changed = sync_to_py(args.py, args.ipynb, write=not args.check)
+    else:
+        changed = sync_to_ipynb(args.ipynb, args.py, write=not args.check)
+    path = args.py if target == "py" else args.ipynb
+    if args.check:
+        print("%s: %d cell(s) out of date" % (path.name, changed) if changed else "in sync")
+        return 1 if changed else 0
+    print("%s: rewrote %d cell(s)" % (path.name, changed) if changed else "in sync")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""Run the book's ```python examples and check their shown output.
+
+The examples are written like a console transcript without the prompts: an
+expression on one line, the ``repr`` of its value on the next.  Each block is
+split into statements and expected values, executed in a fresh namespace in a
+worker process, and compared doctest-style.  Results are cached by a hash of
+the block and the interpreter version, so a repeat run executes only the
+blocks that changed.
+
+    python -m holybook.verify
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from holybook import CACHE_DIR
+from holybook.book import Cell, heading_section, parse_entries, read_cells
+
+DEFAULT_CACHE = CACHE_DIR / "verify.json"
+
+PASS, FAIL, ERROR, SKIP = "pass", "fail", "error", "skip"
+
+# ``def f(arg1, arg2, ...): ...`` is the book's way of writing "any
+# parameters"; it is checked as ``*args``.
+_PLACEHOLDER = re.compile(r",\s*\.\.\.\s*\)")
+_INTERACTIVE = re.compile(r"\b(?:input|breakpoint|help)\s*\(")
+
+
+class Block(NamedTuple):
+    entry: str
+    line: Optional[int]
+    source: str
+
+    @property
+    def key(self) -> str:
+        text = platform.python_version() + "\0" + self.source
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class Outcome(NamedTuple):
+    status: str
+    message: str = ""
+
+
+def extract_blocks(cells: Iterable[Cell]) -> List[Block]:
+    """Every ```python block, tagged with the entry it belongs to."""
+    blocks = []
+    section = ""
+    for cell in cells:
+        heading = heading_section(cell)
+        if heading is not None:
+            section = heading
+            continue
+        if cell.cell_type != "markdown":
+            continue
+        entries = parse_entries([cell], section)
+        lines = cell.lines
+        i = 0
+        while i < len(lines):
+            if lines[i].strip() != "```python":
+                i += 1
+                continue
+            start = i + 1
+            end = start
+            while end < len(lines) and lines[end].strip() != "```":
+                end += 1
+            owner = next((e.name for e in entries if e.start <= i < e.end), "")
+            line = None if cell.offset is None else cell.offset + start + 1
+            blocks.append(Block(owner, line, "\n".join(lines[start:end])))
+            i = end + 1
+    return blocks
+
+
+def split_examples(source: str) -> List[Tuple[str, Optional[str]]]:
+    """Split a block into ``(statement, expected repr or None)`` pairs.
+
+    A top-level expression is followed by its value; every following line
+    belongs to that value until the lines seen so far parse as a complete
+    expression.
+    """
+    lines = source.split("\n")
+    examples: List[Tuple[str, Optional[str]]] = []
+    i = 0
+    while i < len(lines):
+        if not lines[i].strip():
+            i += 1
+            continue
+        # Grow the statement over continuation and indented lines.
+        end = i + 1
+        while end < len(lines) and (lines[end][:1].isspace() or not _parses("\n".join(lines[i:end]))):
+            end += 1
+        if not _parses("\n".join(lines[i:end])):
+            # Report the broken line rather than the rest of the block.
+            end = i + 1
+        statement = "\n".join(lines[i:end]).rstrip()
+        i = end
+        expected = None
+        if _is_expression(statement) and i < len(lines) and lines[i].strip():
+            end = i + 1
+            while end < len(lines) and not _parses("\n".join(lines[i:end]), "eval"):
+                end += 1
+            expected = " ".join(line.strip() for line in lines[i:end])
+            i = end
+        examples.append((statement, expected))
+    return examples
+
+
+def _parses(source: str, mode: str = "exec") -> bool:
+    try:
+        ast.parse(_PLACEHOLDER.sub(", *args)", source), mode=mode)
+    except SyntaxError:
+        return False
+    return True
+
+
+def _is_expression(statement: str) -> bool:
+    try:
+        tree = ast.parse(statement)
+    except SyntaxError:
+        return False
+    return len(tree.body) == 1 and isinstance(tree.body[0], ast.Expr)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def check(source: str) -> Outcome:
+    """Run one block and compare every shown value with the real one."""
+    if _INTERACTIVE.search(source):
+        return Outcome(SKIP, "needs an interactive console")
+    namespace = {"__name__": "__main__"}
+    for statement, expected in split_examples(source):
+        code = _PLACEHOLDER.sub(", *args)", statement)
+        try:
+            compiled = compile(code, "<example>", "eval" if expected is not None else "exec")
+        except SyntaxError as exc:
+            return Outcome(ERROR, "%s: %s\n%s" % (type(exc).__name__, exc.msg, statement))
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                value = eval(compiled, namespace)
+        except Exception as exc:
+            return Outcome(ERROR, "%s: %s\n%s" % (type(exc).__name__, exc, statement))
+        if expected is None:
+            continue
+        got = out.getvalue() + (repr(value) if value is not None else "")
+        if _normalize(got) != _normalize(expected):
+            return Outcome(FAIL, "%s\nexpected: %s\n     got: %s" % (statement, expected, got))
+    return Outcome(PASS)
+
+
+def load_cache(path: Path = DEFAULT_CACHE) -> Dict[str, list]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache: Dict[str, list], path: Path = DEFAULT_CACHE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1)
+    os.replace(tmp, path)
+
+
+def verify(
+    blocks: Sequence[Block],
+    cache_path: Optional[Path] = DEFAULT_CACHE,
+    jobs: Optional[int] = None,
+) -> List[Tuple[Block, Outcome, bool]]:
+    """Check ``blocks``, returning ``(block, outcome, cached)`` triples.
+
+    Only blocks missing from the cache are run, spread over ``jobs`` worker
+    processes.  Pass ``cache_path=None`` to run everything.
+    """
+    cache = load_cache(cache_path) if cache_path is not None else {}
+    pending = sorted({b.source: b.key for b in blocks if b.key not in cache}.items())
+    if pending:
+        sources = [source for source, _ in pending]
+        if len(sources) == 1 or jobs == 1:
+            outcomes = [check(source) for source in sources]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                outcomes = list(pool.map(check, sources))
+        fresh = {key: list(outcome) for (_, key), outcome in zip(pending, outcomes)}
+        cache.update(fresh)
+        if cache_path is not None:
+            live = {b.key for b in blocks}
+            save_cache({k: v for k, v in cache.items() if k in live}, cache_path)
+    else:
+        fresh = {}
+    return [(b, Outcome(*cache[b.key]), b.key not in fresh) for b in blocks]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m holybook.verify", description="Check the book's code examples.")
+    parser.add_argument("--source", type=Path, help="the .py export (default) or the .ipynb")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE)
+    parser.add_argument("--no-cache", action="store_true", help="run every block")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also list the passing blocks")
+    args = parser.parse_args(argv)
+
+    blocks = extract_blocks(read_cells(args.source))
+    results = verify(blocks, None if args.no_cache else args.cache, args.jobs)
+    counts: Dict[str, int] = {}
+    for block, outcome, cached in results:
+        counts[outcome.status] = counts.get(outcome.status, 0) + 1
+        if outcome.status == PASS and not args.verbose:
+            continue
+        where = "line %d" % block.line if block.line else "cell"
+        print("%s: %s (%s)%s" % (where, outcome.status, block.entry, " [cached]" if cached else ""))
+        if outcome.message:
+            print("    " + outcome.message.replace("\n", "\n    "))
+    print(", ".join("%d %s" % (counts[s], s) for s in (PASS, FAIL, ERROR, SKIP) if s in counts))
+    return 1 if counts.get(FAIL) or counts.get(ERROR) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import builtins
+import math
+import warnings
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from holybook import batched  # noqa: E402
+
+DTYPES = ["int8", "int16", "int32", "int64", "uint8", "uint16", "uint32", "uint64", "bool", "float32", "float64"]
+SIZE = 64
+
+
+@pytest.fixture(autouse=True)
+def lists_too(monkeypatch):
+    """Send lists down the NumPy path at any length, as arrays are."""
+    monkeypatch.setattr(batched, "LIST_THRESHOLDS", dict.fromkeys(batched.LIST_THRESHOLDS, 0))
+
+
+def values(dtype, seed=0):
+    """Values spanning the dtype, with its extremes and repeated keys."""
+    rng = np.random.default_rng(seed)
+    dt = np.dtype(dtype)
+    if dt.kind == "b":
+        return rng.integers(0, 2, SIZE).astype(bool)
+    if dt.kind == "f":
+        a = rng.uniform(-50, 50, SIZE).astype(dt)
+        a[:6] = [0.5, -0.5, 2.5, -0.0, 0.0, 3.0]
+        return a
+    info = np.iinfo(dt)
+    a = rng.integers(info.min, info.max, SIZE, dtype=dt, endpoint=True)
+    a[:4] = [info.min, info.max, 0, 1]
+    a[4:12] = a[12:20]
+    return a
+
+
+def inputs(dtype, seed=0):
+    a = values(dtype, seed)
+    yield a
+    yield a.tolist()
+
+
+def same(got, expected):
+    if isinstance(got, np.ndarray):
+        got = got.tolist()
+    if isinstance(got, (list, tuple)):
+        assert len(got) == len(expected)
+        for g, e in zip(got, expected):
+            same(g, e)
+        return
+    if isinstance(expected, float) and math.isnan(expected):
+        assert math.isnan(got)
+    else:
+        assert got == expected and type(got) == type(expected)
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_sum(dtype):
+    for v in inputs(dtype):
+        expected = builtins.sum(values(dtype).tolist())
+        for start in (0, 10):
+            got = batched.sum(v, start)
+            if isinstance(expected, float):
+                # NumPy adds pairwise, so only the last bits may differ.
+                assert got == pytest.approx(expected + start, rel=1e-12, abs=1e-12)
+            else:
+                same(got, expected + start)
+
+
+def test_sum_never_overflows():
+    a = np.full(40, 2 ** 62, dtype=np.int64)
+    assert batched.sum(a) == 40 * 2 ** 62
+    assert batched.sum(np.full(40, 2 ** 64 - 1, dtype=np.uint64)) == 40 * (2 ** 64 - 1)
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("name", ["min", "max"])
+def test_min_max(dtype, name):
+    for v in inputs(dtype):
+        same(getattr(batched, name)(v), getattr(builtins, name)(values(dtype).tolist()))
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("key", [None, abs])
+def test_sorted(dtype, reverse, key):
+    for v in inputs(dtype):
+        expected = builtins.sorted(values(dtype).tolist(), key=key, reverse=reverse)
+        got = batched.sorted(v, key=key, reverse=reverse)
+        same(got, expected)
+        # Stability shows in the sign of equal-keyed zeros and halves.
+        assert [math.copysign(1, x) for x in got] == [math.copysign(1, x) for x in expected]
+
+
+def test_sorted_narrow_minimum():
+    a = np.array([-128, 5, 3, -2] + [0] * 20, dtype=np.int8)
+    assert batched.sorted(a, reverse=True)[:4] == [5, 3, 0, 0]
+    assert batched.sorted(a, key=abs)[-1] == -128
+    assert batched.sorted(a.astype(np.int16) * 256, key=abs)[-1] == -32768
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_abs(dtype):
+    for v in inputs(dtype):
+        same(batched.abs(v), [builtins.abs(x) for x in values(dtype).tolist()])
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_round(dtype):
+    for v in inputs(dtype):
+        same(batched.round(v), [builtins.round(x) for x in values(dtype).tolist()])
+        same(batched.round(v, 1), [builtins.round(x, 1) for x in values(dtype).tolist()])
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("divisor", [3, -3, 2.5, -7.0, np.int64(3), np.float32(1.5), 2 ** 70])
+def test_divmod_scalar(dtype, divisor):
+    scalar = divisor.item() if isinstance(divisor, np.generic) else divisor
+    expected = [builtins.divmod(x, scalar) for x in values(dtype).tolist()]
+    a = values(dtype)
+    q, r = batched.divmod(a, divisor)
+    same(list(zip(q.tolist(), r.tolist())), expected)
+    same(batched.divmod(a.tolist(), divisor), expected)
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_divmod_arrays(dtype):
+    a = values(dtype)
+    b = values(dtype, seed=1)
+    b[b == 0] = 1
+    expected = [builtins.divmod(x, y) for x, y in zip(a.tolist(), b.tolist())]
+    q, r = batched.divmod(a, b)
+    same(list(zip(q.tolist(), r.tolist())), expected)
+
+
+def test_divmod_by_zero():
+    with pytest.raises(ZeroDivisionError):
+        batched.divmod(np.arange(20), 0)
+    with pytest.raises(ZeroDivisionError):
+        batched.divmod(np.arange(5), np.int64(0))
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("exp", [0, 1, 2, 3, -1, 0.5, 2.0, np.int64(2)])
+def test_pow(dtype, exp):
+    scalar = exp.item() if isinstance(exp, np.generic) else exp
+    data = values(dtype).tolist()
+    expected = []
+    for x in data:
+        try:
+            expected.append(builtins.pow(x, scalar))
+        except (OverflowError, ZeroDivisionError) as e:
+            with pytest.raises(type(e)):
+                batched.pow(values(dtype), exp)
+            return
+    got = batched.pow(values(dtype), exp)
+    assert len(got) == len(expected)
+    for g, e in zip(got.tolist(), expected):
+        if isinstance(e, complex) or isinstance(e, float) and math.isfinite(e):
+            # NumPy's vectorized power may round the last bit differently.
+            assert g == pytest.approx(e, rel=1e-15) and type(g) == type(e)
+        else:
+            same(g, e)
+
+
+def test_pow_wide_exponent():
+    same(batched.pow(np.array([0, 1, -1] * 10), 2 ** 70), [builtins.pow(x, 2 ** 70) for x in [0, 1, -1] * 10])
+    with pytest.raises(OverflowError):
+        batched.pow(np.full(20, 1.5), 2 ** 70)
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_any_all(dtype):
+    for v in inputs(dtype):
+        data = values(dtype).tolist()
+        assert batched.any(v) is builtins.any(data)
+        assert batched.all(v) is builtins.all(data)
+        assert batched.all(v[:4]) is builtins.all(data[:4])
+
+
+@pytest.mark.parametrize("size", [batched.ARRAY_THRESHOLD - 1, batched.ARRAY_THRESHOLD, 40])
+def test_zip(size):
+    a, b = np.arange(size), np.arange(size + 5) / 2
+    pairs = batched.zip(a, b)
+    assert next(pairs) == (a[0], b[0])
+    assert list(pairs) == list(zip(a, b))[1:]
+    assert all(type(t) is tuple for t in batched.zip(a.tolist(), b.tolist()))
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_zip_rows(dtype):
+    a, b = values(dtype), values(dtype, seed=1)[:40]
+    same(batched.zip_rows(a, b), [list(t) for t in zip(a.tolist(), b.tolist())])
+    if dtype in ("int64", "float64"):
+        # Lists become arrays of NumPy's choosing; these two are unambiguous.
+        same(batched.zip_rows(a.tolist(), iter(b.tolist())), [list(t) for t in zip(a.tolist(), b.tolist())])
+
+
+def test_divmod_non_finite():
+    a = np.array([np.inf, -np.inf, np.nan, 1.0] * 5)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        q, r = batched.divmod(a, 3.0)
+    same(list(zip(q.tolist(), r.tolist())), [builtins.divmod(x, 3.0) for x in a.tolist()])
+
+
+def test_nan():
+    a = np.array([1.0, float("nan"), -3.0] * 10)
+    data = a.tolist()
+    same(batched.min(a), builtins.min(data))
+    same(batched.max(a), builtins.max(data))
+    same(batched.sorted(a), builtins.sorted(data))
+    same(batched.abs(a), [builtins.abs(x) for x in data])
+    assert math.isnan(batched.sum(a))
+    with pytest.raises(ValueError):
+        batched.round(a)
+    assert batched.all(a) and batched.any(a)
@@ -0,0 +1,77 @@
+import shutil
+
+import pytest
+
+from holybook import BOOK_IPYNB, BOOK_PY, ROOT
+from holybook import sync
+
+LAB = "The Holy Book of Python 3.9.7 - open() performance lab"
+BOOKS = [(BOOK_PY, BOOK_IPYNB), (ROOT / (LAB + ".py"), ROOT / (LAB + ".ipynb"))]
+PHRASE = "from left to right"
+
+
+@pytest.fixture
+def book(tmp_path):
+    py, ipynb = tmp_path / "book.py", tmp_path / "book.ipynb"
+    shutil.copyfile(BOOK_PY, py)
+    shutil.copyfile(BOOK_IPYNB, ipynb)
+    return py, ipynb
+
+
+def edit(path, old, new):
+    text = path.read_text(encoding="utf-8")
+    assert text.count(old) == 1
+    path.write_text(text.replace(old, new), encoding="utf-8")
+
+
+def changed_regions(before, after):
+    """Indexes of the regions whose text differs; the documents must keep their cell count."""
+    assert before.prefix == after.prefix and before.suffix == after.suffix
+    assert len(before.regions) == len(after.regions)
+    return [i for i, (a, b) in enumerate(zip(before.regions, after.regions)) if a.text != b.text]
+
+
+@pytest.mark.parametrize("py, ipynb", BOOKS)
+def test_in_sync(py, ipynb):
+    assert sync.sync_to_py(py, ipynb, write=False) == 0
+    assert sync.sync_to_ipynb(ipynb, py, write=False) == 0
+
+
+@pytest.mark.parametrize("py, ipynb", BOOKS)
+def test_export_from_scratch(tmp_path, py, ipynb):
+    fresh = tmp_path / "fresh.py"
+    sync.sync_to_py(fresh, ipynb)
+    assert fresh.read_bytes() == py.read_bytes()
+
+
+def test_one_cell_to_py(book):
+    py, ipynb = book
+    before = sync.read_py(py)
+    edit(ipynb, PHRASE, "left to right")
+    assert sync.sync_to_py(py, ipynb) == 1
+    after = sync.read_py(py)
+    [i] = changed_regions(before, after)
+    assert "left to right" in after.regions[i].source and PHRASE not in after.regions[i].source
+    assert sync.sync_to_ipynb(ipynb, py, write=False) == 0
+
+
+def test_one_cell_to_ipynb(book):
+    py, ipynb = book
+    before, cells = sync.read_ipynb(ipynb)
+    edit(py, PHRASE, "left to right")
+    assert sync.sync_to_ipynb(ipynb, py) == 1
+    after, new_cells = sync.read_ipynb(ipynb)
+    [i] = changed_regions(before, after)
+    assert new_cells[i]["metadata"] == cells[i]["metadata"]
+    assert "left to right" in after.regions[i].source
+    assert sync.sync_to_py(py, ipynb, write=False) == 0
+
+
+def test_round_trip_restores_bytes(book):
+    py, ipynb = book
+    original = ipynb.read_bytes()
+    edit(py, PHRASE, "left to right")
+    sync.sync_to_ipynb(ipynb, py)
+    edit(py, "left to right", PHRASE)
+    sync.sync_to_ipynb(ipynb, py)
+    assert ipynb.read_bytes() == original